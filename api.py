@@ -0,0 +1,433 @@
+# File: api.py
+"""
+Local HTTP API over a Department, built on asyncio with no dependencies
+beyond the standard library.
+
+    python api.py --port 8080
+    python api.py --department Sales --port 8081
+    curl 'localhost:8080/employees?limit=50'
+    curl 'localhost:8080/employees?q=nguyen'
+    curl 'localhost:8080/employees?stream=1'
+    curl -X POST localhost:8080/employees -d '{"emp_id": "E1", "name": "An", ...}'
+    curl -X POST localhost:8080/employees/batch -d '[{"op": "remove", "id": "E1"}, ...]'
+
+Connections are kept alive (HTTP/1.1). List and search responses are
+paged by an emp_id cursor, or streamed as JSON Lines with stream=1. Every
+GET carries an ETag that changes with the roster, so pollers can send
+If-None-Match and get 304 back. A batch request is applied in one
+Department transaction, i.e. a single persistence commit.
+"""
+
+from http import HTTPStatus
+from typing import Dict, Iterator, Optional, Set, Tuple
+from urllib.parse import parse_qsl, unquote, urlsplit
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import sys
+
+from app_logging import setup_logging, shutdown_logging
+from memo import EmployeeMemo
+from models import ChangeBatch, Department, Employee
+from organization import department_data_file
+from persistence import BackgroundStore, PersistenceWorker
+from search import SearchIndex
+from storage import create_store
+from validation import validate_record
+
+# Largest request body accepted, in bytes
+MAX_BODY = 16 * 1024 * 1024
+# Records per chunk of a streamed list
+STREAM_CHUNK = 1000
+# How often the data file is checked for changes made by other instances
+WATCH_INTERVAL = 2.0
+
+
+class HTTPError(Exception):
+    def __init__(self, status: HTTPStatus, message: str, **details):
+        super().__init__(message)
+        self.status = status
+        self.payload = {'error': message, **details}
+
+
+class Request:
+    def __init__(self, method: str, target: str, headers: Dict[str, str], body: bytes):
+        self.method = method
+        url = urlsplit(target)
+        self.path = unquote(url.path)
+        self.query = dict(parse_qsl(url.query))
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        try:
+            return json.loads(self.body)
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Request body must be valid JSON.")
+
+    def int_param(self, name: str, default: int, maximum: int) -> int:
+        try:
+            value = int(self.query.get(name, default))
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"'{name}' must be an integer.")
+        return max(1, min(value, maximum))
+
+
+class Response:
+    def __init__(self, status: HTTPStatus = HTTPStatus.OK, payload=None,
+                 headers: Optional[Dict[str, str]] = None, stream: Optional[Iterator[bytes]] = None):
+        self.status = status
+        self.body = b"" if payload is None else json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.headers = headers or {}
+        self.stream = stream
+        if payload is not None:
+            self.headers['Content-Type'] = "application/json; charset=utf-8"
+
+    @classmethod
+    def from_json(cls, text: str, status: HTTPStatus = HTTPStatus.OK,
+                  headers: Optional[Dict[str, str]] = None) -> "Response":
+        # For bodies assembled from already serialized records
+        response = cls(status, headers=headers)
+        response.body = text.encode("utf-8")
+        response.headers['Content-Type'] = "application/json; charset=utf-8"
+        return response
+
+
+def _record_json(emp: Employee) -> str:
+    return json.dumps(emp.to_dict(), ensure_ascii=False)
+
+
+class EmployeeAPI:
+    """
+    Routes requests to a Department. Handlers run on the event loop
+    thread, which is the only one touching the department.
+    """
+
+    def __init__(self, department: Department, page_size: int = 100, max_page_size: int = 1000):
+        self.department = department
+        self.page_size = page_size
+        self.max_page_size = max_page_size
+        # Bumped once per change to the roster; the ETag of every GET response
+        self.version = 0
+        self._etag_prefix = os.urandom(4).hex()
+        self.search_index: Optional[SearchIndex] = None
+        # Serialized records, reused until the employee changes
+        self.records = EmployeeMemo(department, _record_json)
+        department.subscribe(self.on_department_changed, batched=True)
+
+    def on_department_changed(self, batch: ChangeBatch):
+        self.version += 1
+        if batch.is_reset:
+            self.search_index = None
+            return
+        if self.search_index is not None:
+            for event in batch:
+                self.search_index.apply_change(event)
+
+    @property
+    def etag(self) -> str:
+        return f'"{self._etag_prefix}-{self.version}"'
+
+    def handle(self, request: Request) -> Response:
+        try:
+            if request.method == "GET" and request.headers.get('if-none-match') == self.etag:
+                return Response(HTTPStatus.NOT_MODIFIED, headers={'ETag': self.etag})
+            response = self.route(request)
+        except HTTPError as e:
+            return Response(e.status, e.payload)
+        except IOError as e:
+            logging.error("API request failed: %s", e, extra={'operation': 'api'})
+            return Response(HTTPStatus.INTERNAL_SERVER_ERROR, {'error': str(e)})
+        except Exception as e:
+            # Still answer the client; an escaped exception would drop the
+            # connection without a response
+            logging.error("Unexpected error handling %s %s: %s", request.method, request.path, e,
+                          extra={'operation': 'api'}, exc_info=True)
+            return Response(HTTPStatus.INTERNAL_SERVER_ERROR, {'error': "Internal server error."})
+        if request.method == "GET":
+            response.headers['ETag'] = self.etag
+        return response
+
+    def route(self, request: Request) -> Response:
+        parts = [part for part in request.path.split("/") if part]
+        if not parts or parts[0] != "employees" or len(parts) > 2:
+            raise HTTPError(HTTPStatus.NOT_FOUND, "Not found.")
+        if len(parts) == 1:
+            if request.method == "GET":
+                return self.list_employees(request)
+            if request.method == "POST":
+                return self.add_employee(request)
+        elif parts[1] == "batch":
+            if request.method == "POST":
+                return self.apply_batch(request)
+        else:
+            emp_id = parts[1]
+            if request.method == "GET":
+                return Response.from_json(self._record(emp_id))
+            if request.method == "PUT":
+                return self.update_employee(request, emp_id)
+            if request.method == "DELETE":
+                return self.remove_employee(emp_id)
+        raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, "Method not allowed.")
+
+    def _get(self, emp_id: str):
+        try:
+            return self.department.get_employee(emp_id)
+        except ValueError as e:
+            raise HTTPError(HTTPStatus.NOT_FOUND, str(e))
+
+    def _record(self, emp_id: str) -> str:
+        try:
+            return self.records.get(emp_id)
+        except ValueError as e:
+            raise HTTPError(HTTPStatus.NOT_FOUND, str(e))
+
+    def _validated(self, record) -> Employee:
+        if not isinstance(record, dict):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Employee must be a JSON object.")
+        employee, errors = validate_record(record)
+        if errors:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid employee.", fields=errors)
+        return employee
+
+    def list_employees(self, request: Request) -> Response:
+        """
+        GET /employees?limit=&after=&q=&stream=1. Pages are ordered by
+        emp_id and continue after the cursor returned as next.
+        """
+        query = request.query.get('q', "")
+        matching = None
+        if query.strip():
+            if self.search_index is None:
+                self.search_index = SearchIndex(self.department.list_employees())
+            matching = self.search_index.search(query)
+        if request.query.get('stream') in ("1", "true"):
+            return Response(headers={'Content-Type': "application/x-ndjson; charset=utf-8"},
+                            stream=self._stream(matching))
+        limit = request.int_param('limit', self.page_size, self.max_page_size)
+        page = self.department.page(request.query.get('after'), limit, matching)
+        return Response.from_json('{"employees": [%s], "total": %d, "next": %s}' % (
+            ", ".join(self.records.get(emp.emp_id) for emp in page.employees), page.total,
+            json.dumps(page.next_cursor, ensure_ascii=False)))
+
+    def _stream(self, matching: Optional[Set[str]]) -> Iterator[bytes]:
+        # Read page by page from a cursor, so records changed while the
+        # stream is in flight are served as they are when reached
+        page = self.department.page(None, STREAM_CHUNK, matching)
+        while True:
+            if page.employees:
+                yield ("\n".join(self.records.get(emp.emp_id) for emp in page.employees) + "\n").encode("utf-8")
+            if page.next_cursor is None:
+                return
+            page = self.department.page(page.next_cursor, STREAM_CHUNK, matching)
+
+    def add_employee(self, request: Request) -> Response:
+        employee = self._validated(request.json())
+        try:
+            self.department.add_employee(employee)
+        except ValueError as e:
+            raise HTTPError(HTTPStatus.CONFLICT, str(e))
+        return Response(HTTPStatus.CREATED, employee.to_dict(), {'Location': f"/employees/{employee.emp_id}"})
+
+    def update_employee(self, request: Request, emp_id: str) -> Response:
+        self._get(emp_id)
+        employee = self._validated(request.json())
+        try:
+            self.department.update_employee(employee, emp_id)
+        except ValueError as e:
+            raise HTTPError(HTTPStatus.CONFLICT, str(e))
+        return Response(payload=employee.to_dict())
+
+    def remove_employee(self, emp_id: str) -> Response:
+        self._get(emp_id)
+        self.department.remove_employee(emp_id)
+        return Response(HTTPStatus.NO_CONTENT)
+
+    def apply_batch(self, request: Request) -> Response:
+        """
+        POST /employees/batch with a list of journal-style operations:
+        {"op": "add", "emp": {...}}, {"op": "update", "id": ..., "emp":
+        {...}} or {"op": "remove", "id": ...}. All of them are validated
+        first and then applied in one transaction, or none are.
+        """
+        operations = request.json()
+        if not isinstance(operations, list):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Batch must be a JSON array of operations.")
+        parsed = []
+        errors = []
+        for position, operation in enumerate(operations):
+            try:
+                parsed.append(self._parse_operation(operation))
+            except HTTPError as e:
+                errors.append({'index': position, **e.payload})
+        if errors:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid operations.", operations=errors)
+        position = 0
+        try:
+            with self.department.transaction():
+                for position, (op, emp_id, employee) in enumerate(parsed):
+                    if op == 'add':
+                        self.department.add_employee(employee)
+                    elif op == 'update':
+                        self.department.update_employee(employee, emp_id)
+                    else:
+                        self.department.remove_employee(emp_id)
+        except ValueError as e:
+            raise HTTPError(HTTPStatus.CONFLICT, str(e), index=position)
+        return Response(payload={'applied': len(parsed)})
+
+    def _parse_operation(self, operation) -> Tuple[str, Optional[str], Optional[Employee]]:
+        if not isinstance(operation, dict) or operation.get('op') not in ('add', 'update', 'remove'):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Operation must have op add, update or remove.")
+        op = operation['op']
+        emp_id = operation.get('id')
+        if op != 'add' and not isinstance(emp_id, str):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"'{op}' needs the employee's id.")
+        employee = self._validated(operation.get('emp')) if op != 'remove' else None
+        return op, emp_id, employee
+
+    # Connection handling
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                if isinstance(request, HTTPError):
+                    response, keep_alive = Response(request.status, request.payload), False
+                else:
+                    response = self.handle(request)
+                    keep_alive = request.headers.get('connection', "").lower() != "close"
+                await self._write_response(writer, response, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader):
+        """
+        Returns the next Request, None once the client has closed the
+        connection, or an HTTPError for a malformed request.
+        """
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError:
+            return None
+        except asyncio.LimitOverrunError:
+            return HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Request headers too large.")
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, rest = lines[0].split(" ", 1)
+            target, version = rest.rsplit(" ", 1)
+        except ValueError:
+            return HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line.")
+        headers = {}
+        for line in lines[1:]:
+            if line:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+        if version == "HTTP/1.0" and headers.get('connection', "").lower() != "keep-alive":
+            headers['connection'] = "close"
+        try:
+            length = int(headers.get('content-length', 0))
+        except ValueError:
+            return HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length.")
+        if length < 0:
+            return HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length.")
+        if length > MAX_BODY:
+            return HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large.")
+        body = await reader.readexactly(length) if length else b""
+        return Request(method, target, headers, body)
+
+    async def _write_response(self, writer: asyncio.StreamWriter, response: Response, keep_alive: bool):
+        status = response.status
+        lines = [f"HTTP/1.1 {status.value} {status.phrase}"]
+        lines += [f"{name}: {value}" for name, value in response.headers.items()]
+        if response.stream is not None:
+            lines.append("Transfer-Encoding: chunked")
+        elif status != HTTPStatus.NO_CONTENT and status != HTTPStatus.NOT_MODIFIED:
+            lines.append(f"Content-Length: {len(response.body)}")
+        lines.append("Connection: keep-alive" if keep_alive else "Connection: close")
+        head = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+        if response.stream is None:
+            # One write, so head and body usually leave in one segment
+            writer.write(head + response.body)
+        else:
+            writer.write(head)
+            for chunk in response.stream:
+                writer.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                await writer.drain()
+            writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    async def watch_storage(self):
+        # Picks up edits made through the GUI or another instance
+        while True:
+            await asyncio.sleep(WATCH_INTERVAL)
+            try:
+                if self.department.storage.changed_externally():
+                    self.department.refresh()
+            except IOError as e:
+                logging.error("Error merging external changes: %s", e, extra={'operation': 'refresh'})
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8080):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        watcher = asyncio.create_task(self.watch_storage())
+        logging.info("Serving %s on http://%s:%d", self.department.name, host, port, extra={'operation': 'api'})
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            watcher.cancel()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Employee Management System HTTP API")
+    parser.add_argument("--data-dir", default="departments",
+                        help="directory of department files shared with the GUI")
+    parser.add_argument("--department", default="HR", help="department name")
+    parser.add_argument("--data-file",
+                        help="use this data file (.json, or .db for SQLite) instead of the department's file")
+    parser.add_argument("--journaled", action="store_true",
+                        help="append changes to a journal instead of rewriting the file")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    return parser
+
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.data_file is None:
+        args.data_file = department_data_file(args.data_dir, args.department)
+    # Stop as on Ctrl+C so queued writes are flushed
+    signal.signal(signal.SIGTERM, _interrupt)
+    log_listener = setup_logging("api.log")
+    # Writes are handed to a background thread so they never stall the loop
+    worker = PersistenceWorker()
+    try:
+        store = BackgroundStore(create_store(args.data_file, journaled=args.journaled), worker)
+        department = Department(args.department, storage=store)
+        try:
+            asyncio.run(EmployeeAPI(department).serve(args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            department.storage.close()
+    finally:
+        worker.stop()
+        shutdown_logging(log_listener)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
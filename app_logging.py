@@ -0,0 +1,78 @@
+# File: app_logging.py
+
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+import datetime
+import json
+import logging
+import queue
+import sys
+
+# Attributes passed through `extra=` that are copied into JSON records
+STRUCTURED_FIELDS = ('emp_id', 'operation', 'department')
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats a record as one JSON object per line.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key in STRUCTURED_FIELDS:
+            value = getattr(record, key, None)
+            if value is not None:
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class LazyQueueHandler(QueueHandler):
+    """
+    QueueHandler that leaves message formatting to the listener thread.
+    The stock handler formats in prepare(), i.e. on the calling thread;
+    log arguments are expected to be immutable values such as IDs.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def setup_logging(log_file: str = "app.log", level: int = logging.INFO,
+                  max_bytes: int = 5 * 1024 * 1024, backup_count: int = 5) -> QueueListener:
+    """
+    Routes all logging through an in-memory queue drained by a listener
+    thread that writes JSON lines to a rotating file and plain text to
+    stdout. Call shutdown_logging() with the returned listener on exit.
+    """
+    file_handler = RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count,
+                                       encoding='utf-8')
+    file_handler.setFormatter(JsonFormatter())
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(LazyQueueHandler(log_queue))
+    root.setLevel(level)
+    listener.start()
+    return listener
+
+
+def shutdown_logging(listener: QueueListener):
+    """
+    Drains the queue, then flushes and closes the output handlers.
+    """
+    listener.stop()
+    for handler in listener.handlers:
+        handler.flush()
+        handler.close()
@@ -0,0 +1,191 @@
+# File: benchmarks/api_load.py
+"""
+Load generator for the HTTP API. Starts api.py in a subprocess on a
+synthetic roster, then drives it from keep-alive connections and reports
+throughput and latency per request mix.
+
+    python benchmarks/api_load.py
+    python benchmarks/api_load.py --size 100000 --connections 32 --requests 20000
+"""
+
+from typing import List, Tuple
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, ROOT)
+
+from generators import DEFAULT_SEED, generate_employees  # noqa: E402
+from storage import JsonFileStore  # noqa: E402
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def read_response(reader: asyncio.StreamReader) -> Tuple[int, dict, bytes]:
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ", 2)[1])
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+    if headers.get("transfer-encoding") == "chunked":
+        body = bytearray()
+        while True:
+            size = int((await reader.readuntil(b"\r\n"))[:-2], 16)
+            chunk = await reader.readexactly(size + 2)
+            if size == 0:
+                break
+            body += chunk[:-2]
+        return status, headers, bytes(body)
+    length = int(headers.get("content-length", 0))
+    return status, headers, await reader.readexactly(length) if length else b""
+
+
+def make_request(method: str, path: str, body=None, headers=None) -> bytes:
+    data = b"" if body is None else json.dumps(body).encode("utf-8")
+    lines = [f"{method} {path} HTTP/1.1", "Host: localhost", f"Content-Length: {len(data)}"]
+    lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + data
+
+
+class Mix:
+    """
+    Picks the next request of a workload. Each mix is a list of
+    (weight, kind) pairs.
+    """
+    MIXES = {
+        "read": [(70, "get"), (20, "page"), (10, "etag")],
+        "mixed": [(50, "get"), (15, "page"), (10, "etag"), (5, "search"), (15, "update"), (5, "batch")],
+        "write": [(70, "update"), (30, "batch")],
+    }
+
+    def __init__(self, name: str, emp_ids: List[str], seed: int):
+        self.rnd = random.Random(seed)
+        self.emp_ids = emp_ids
+        self.kinds = [kind for weight, kind in self.MIXES[name] for _ in range(weight)]
+        self.etag = None
+
+    def next(self) -> bytes:
+        kind = self.rnd.choice(self.kinds)
+        emp_id = self.rnd.choice(self.emp_ids)
+        if kind == "get":
+            return make_request("GET", f"/employees/{emp_id}")
+        if kind == "page":
+            return make_request("GET", f"/employees?limit=100&after={emp_id}")
+        if kind == "etag":
+            return make_request("GET", "/employees?limit=10", headers={"If-None-Match": self.etag or '""'})
+        if kind == "search":
+            return make_request("GET", "/employees?q=nguy&limit=20")
+        if kind == "update":
+            return make_request("PUT", f"/employees/{emp_id}", self._record(emp_id))
+        ids = self.rnd.sample(self.emp_ids, 10)
+        return make_request("POST", "/employees/batch",
+                            [{"op": "update", "id": i, "emp": self._record(i)} for i in ids])
+
+    def _record(self, emp_id: str) -> dict:
+        return {"emp_id": emp_id, "name": "Nguyễn Văn An", "birthday": "01/01/1990",
+                "salary_rate": round(self.rnd.uniform(5, 50), 2)}
+
+
+async def client(port: int, mix: Mix, count: int, latencies: List[float], failures: List[int]):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        for _ in range(count):
+            request = mix.next()
+            started = time.perf_counter()
+            writer.write(request)
+            status, headers, _ = await read_response(reader)
+            latencies.append(time.perf_counter() - started)
+            if status >= 400:
+                failures.append(status)
+            if "etag" in headers:
+                mix.etag = headers["etag"]
+    finally:
+        writer.close()
+
+
+async def run_load(port: int, mix_name: str, emp_ids: List[str], connections: int, requests: int) -> dict:
+    latencies: List[float] = []
+    failures: List[int] = []
+    per_client = max(1, requests // connections)
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        client(port, Mix(mix_name, emp_ids, DEFAULT_SEED + i), per_client, latencies, failures)
+        for i in range(connections)
+    ))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "mix": mix_name,
+        "requests": len(latencies),
+        "seconds": elapsed,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000,
+        "failures": len(failures),
+    }
+
+
+async def wait_for_port(port: int, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=10000, help="employees in the roster")
+    parser.add_argument("--connections", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=10000, help="requests per mix")
+    parser.add_argument("--mixes", nargs="+", default=list(Mix.MIXES), choices=list(Mix.MIXES))
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="ems-api-")
+    data_file = os.path.join(workdir, "employees.json")
+    employees = generate_employees(args.size)
+    JsonFileStore(data_file).save(employees)
+    emp_ids = [emp.emp_id for emp in employees]
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "api.py"), "--data-file", data_file, "--journaled",
+         "--port", str(port)],
+        cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        asyncio.run(wait_for_port(port))
+        print(f"{'mix':<8}{'requests':>10}{'seconds':>10}{'req/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'failed':>8}")
+        for mix_name in args.mixes:
+            row = asyncio.run(run_load(port, mix_name, emp_ids, args.connections, args.requests))
+            print(f"{row['mix']:<8}{row['requests']:>10}{row['seconds']:>10.2f}{row['rps']:>10.0f}"
+                  f"{row['p50_ms']:>9.2f}{row['p99_ms']:>9.2f}{row['failures']:>8}", flush=True)
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
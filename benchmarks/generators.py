@@ -0,0 +1,41 @@
+# File: benchmarks/generators.py
+"""
+Deterministic synthetic rosters for benchmarks, with Vietnamese names.
+"""
+
+from typing import Iterator, List, Tuple
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from models import Employee  # noqa: E402
+
+FAMILY_NAMES = [
+    "Nguyễn", "Trần", "Lê", "Phạm", "Hoàng", "Huỳnh", "Phan", "Vũ", "Võ", "Đặng",
+    "Bùi", "Đỗ", "Hồ", "Ngô", "Dương", "Lý",
+]
+MIDDLE_NAMES = ["Văn", "Thị", "Hữu", "Đức", "Minh", "Ngọc", "Thanh", "Quốc", "Xuân", "Hoàng"]
+GIVEN_NAMES = [
+    "An", "Bình", "Châu", "Dũng", "Đức", "Hà", "Hải", "Hạnh", "Hùng", "Khang",
+    "Khánh", "Linh", "Long", "Mạnh", "Nam", "Ngân", "Phúc", "Quân", "Thảo", "Trang",
+    "Tuấn", "Uyên", "Việt", "Yến",
+]
+
+DEFAULT_SEED = 22130116
+
+
+def generate_rows(count: int, seed: int = DEFAULT_SEED, prefix: str = "EMP") -> Iterator[Tuple[str, str, str, float]]:
+    rnd = random.Random(seed)
+    for i in range(count):
+        yield (
+            f"{prefix}{i:07d}",
+            f"{rnd.choice(FAMILY_NAMES)} {rnd.choice(MIDDLE_NAMES)} {rnd.choice(GIVEN_NAMES)}",
+            f"{rnd.randint(1, 28):02d}/{rnd.randint(1, 12):02d}/{rnd.randint(1960, 2005)}",
+            round(rnd.uniform(3.0, 50.0), 2),
+        )
+
+
+def generate_employees(count: int, seed: int = DEFAULT_SEED, prefix: str = "EMP") -> List[Employee]:
+    return [Employee(*row) for row in generate_rows(count, seed, prefix)]
@@ -0,0 +1,56 @@
+# File: benchmarks/memory_footprint.py
+"""
+Compares the memory held by a roster in three layouts: the original
+dict-backed dataclass records, the slotted Employee, and the columnar
+EmployeeTable.
+
+    python benchmarks/memory_footprint.py 100000 1000000
+"""
+
+from dataclasses import dataclass
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from columnar import EmployeeTable  # noqa: E402
+from generators import generate_rows  # noqa: E402
+from models import Employee  # noqa: E402
+
+
+@dataclass
+class DictEmployee:
+    # The record layout before Employee gained __slots__
+    emp_id: str
+    name: str
+    birthday: str
+    salary_rate: float
+
+
+def measure(build, count: int) -> int:
+    # Rows are generated inside the traced region so the strings and floats
+    # each layout keeps alive are counted too
+    tracemalloc.start()
+    roster = build(generate_rows(count))
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del roster
+    return current
+
+
+def main(counts):
+    layouts = [
+        ("dataclass (__dict__)", lambda rows: [DictEmployee(*row) for row in rows]),
+        ("Employee (__slots__)", lambda rows: [Employee(*row) for row in rows]),
+        ("EmployeeTable", lambda rows: EmployeeTable(Employee(*row) for row in rows)),
+    ]
+    print(f"{'layout':<22}{'records':>10}{'MiB':>10}{'bytes/record':>14}")
+    for count in counts:
+        for label, build in layouts:
+            size = measure(build, count)
+            print(f"{label:<22}{count:>10}{size / 2 ** 20:>10.1f}{size / count:>14.0f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [100000, 1000000])
@@ -0,0 +1,357 @@
+# File: benchmarks/run_benchmarks.py
+"""
+Times the model, storage and view hot paths over synthetic rosters and
+records time and peak Python memory per case. Qt cases run under the
+offscreen platform.
+
+    python benchmarks/run_benchmarks.py --sizes 1000 10000 100000 --output before.json
+    python benchmarks/run_benchmarks.py --output after.json --compare before.json
+"""
+
+from typing import Callable, Dict, List, Optional
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from duplicates import find_duplicates  # noqa: E402
+from generators import generate_employees  # noqa: E402
+from models import Department, Employee  # noqa: E402
+from search import SearchIndex  # noqa: E402
+from snapshot import snapshot_path, write_snapshot  # noqa: E402
+from storage import EmployeeStore, JsonFileStore, SQLiteStore  # noqa: E402
+
+# Mutations timed per model case, independent of roster size
+OPERATIONS = 1000
+
+BENCHMARKS: Dict[str, Callable] = {}
+
+
+def benchmark(name: str, qt: bool = False):
+    """
+    Registers a case. The decorated function receives the roster size and a
+    scratch directory, does its setup and returns the callable to time.
+    """
+    def register(setup):
+        setup.qt = qt
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+class NullStore(EmployeeStore):
+    # Keeps model cases free of I/O
+
+    def load(self):
+        return None
+
+    def apply(self, entry, employees):
+        pass
+
+    def save(self, employees):
+        pass
+
+
+def _department(size: int) -> Department:
+    return Department("Bench", employees=generate_employees(size), storage=NullStore())
+
+
+@benchmark("department.add_employee")
+def bench_add(size, workdir):
+    department = _department(size)
+    hires = generate_employees(OPERATIONS, seed=1, prefix="NEW")
+
+    def run():
+        for emp in hires:
+            department.add_employee(emp)
+    return run
+
+
+@benchmark("department.update_employee")
+def bench_update(size, workdir):
+    department = _department(size)
+    targets = department.list_employees()[::max(1, size // OPERATIONS)][:OPERATIONS]
+    updates = [Employee(emp.emp_id, emp.name, emp.birthday, emp.salary_rate + 1) for emp in targets]
+
+    def run():
+        for emp in updates:
+            department.update_employee(emp)
+    return run
+
+
+@benchmark("department.remove_employee")
+def bench_remove(size, workdir):
+    department = _department(size)
+    emp_ids = [emp.emp_id for emp in department.list_employees()[::max(1, size // OPERATIONS)][:OPERATIONS]]
+
+    def run():
+        for emp_id in emp_ids:
+            department.remove_employee(emp_id)
+    return run
+
+
+@benchmark("json.save_employees")
+def bench_json_save(size, workdir):
+    store = JsonFileStore(os.path.join(workdir, "save.json"), snapshot=False)
+    employees = generate_employees(size)
+    return lambda: store.save(employees)
+
+
+@benchmark("snapshot.save_employees")
+def bench_snapshot_save(size, workdir):
+    path = os.path.join(workdir, "save-snapshot.json")
+    employees = generate_employees(size)
+    return lambda: write_snapshot(snapshot_path(path), employees, None)
+
+
+@benchmark("json.load_employees")
+def bench_json_load(size, workdir):
+    store = JsonFileStore(os.path.join(workdir, "load.json"), snapshot=False)
+    store.save(generate_employees(size))
+    return lambda: Department("Bench", storage=store)
+
+
+@benchmark("snapshot.load_employees")
+def bench_snapshot_load(size, workdir):
+    store = JsonFileStore(os.path.join(workdir, "load-snapshot.json"))
+    store.save(generate_employees(size))
+    return lambda: Department("Bench", storage=store)
+
+
+@benchmark("journal.add_employee")
+def bench_journal_add(size, workdir):
+    department = Department("Bench", employees=generate_employees(size),
+                            storage=JsonFileStore(os.path.join(workdir, f"journal-{time.monotonic_ns()}.json"),
+                                                  journaled=True))
+    hires = generate_employees(OPERATIONS // 10, seed=1, prefix="NEW")
+
+    def run():
+        for emp in hires:
+            department.add_employee(emp)
+    return run
+
+
+@benchmark("sqlite.save_employees")
+def bench_sqlite_save(size, workdir):
+    store = SQLiteStore(os.path.join(workdir, f"save-{time.monotonic_ns()}.db"))
+    employees = generate_employees(size)
+    return lambda: store.save(employees)
+
+
+@benchmark("sqlite.load_employees")
+def bench_sqlite_load(size, workdir):
+    store = SQLiteStore(os.path.join(workdir, f"load-{time.monotonic_ns()}.db"))
+    store.save(generate_employees(size))
+    return lambda: Department("Bench", storage=store)
+
+
+@benchmark("search.build_index")
+def bench_search_build(size, workdir):
+    employees = generate_employees(size)
+    return lambda: SearchIndex(employees)
+
+
+@benchmark("search.query")
+def bench_search_query(size, workdir):
+    index = SearchIndex(generate_employees(size))
+    queries = ["nguyen", "Đức", "EMP00012", "tran thi", "an"]
+
+    def run():
+        for query in queries:
+            index.search(query)
+    return run
+
+
+@benchmark("duplicates.find")
+def bench_duplicates(size, workdir):
+    employees = generate_employees(size)
+    return lambda: find_duplicates(employees)
+
+
+@benchmark("view.display_employees", qt=True)
+def bench_display(size, workdir):
+    view = _view()
+    employees = generate_employees(size)
+    return lambda: view.display_employees(employees)
+
+
+@benchmark("view.display_pages", qt=True)
+def bench_display_pages(size, workdir):
+    view = _view()
+    department = _department(size)
+    return lambda: view.display_pages(department.page)
+
+
+@benchmark("view.filter_employees", qt=True)
+def bench_filter(size, workdir):
+    view = _view()
+    employees = generate_employees(size)
+    view.display_employees(employees)
+    index = SearchIndex(employees)
+
+    def run():
+        for query in ["n", "ng", "nguyen", "nguyen van", ""]:
+            view.show_search_results(index.search(query) if query else None)
+    return run
+
+
+@benchmark("view.sort_employees", qt=True)
+def bench_sort(size, workdir):
+    from PyQt6.QtCore import Qt
+
+    view = _view()
+    view.display_employees(generate_employees(size))
+
+    def run():
+        for column in range(len(view.table_model.HEADERS)):
+            view.table.sortByColumn(column, Qt.SortOrder.AscendingOrder)
+    return run
+
+
+@benchmark("view.apply_change", qt=True)
+def bench_apply_change(size, workdir):
+    from models import ChangeEvent
+
+    view = _view()
+    view.display_employees(generate_employees(size))
+    hires = generate_employees(OPERATIONS, seed=1, prefix="NEW")
+
+    def run():
+        for emp in hires:
+            view.apply_change(ChangeEvent(ChangeEvent.INSERTED, emp.emp_id, new=emp))
+    return run
+
+
+@benchmark("view.apply_change_filtered", qt=True)
+def bench_apply_change_filtered(size, workdir):
+    # Changes to rows a search left out of the fetched pages must be
+    # skipped, not looked up
+    from models import ChangeEvent
+
+    view = _view()
+    department = _department(size)
+    employees = department.list_employees()
+    matching = {emp.emp_id for emp in employees[::2]}
+    view.display_pages(lambda after, limit: department.page(after, limit, matching))
+    events = []
+    for emp in employees[1::2][:OPERATIONS]:
+        renamed = Employee(emp.emp_id, emp.name + " B", emp.birthday, emp.salary_rate)
+        events.append(ChangeEvent(ChangeEvent.UPDATED, emp.emp_id, old=emp, new=renamed))
+        events.append(ChangeEvent(ChangeEvent.REMOVED, emp.emp_id, old=renamed))
+
+    def run():
+        for event in events:
+            view.apply_change(event)
+    return run
+
+
+_app = None
+
+
+def _view():
+    global _app
+    from PyQt6.QtWidgets import QApplication
+    from views import EmployeeView
+
+    if _app is None:
+        _app = QApplication.instance() or QApplication([])
+    view = EmployeeView()
+    view.ensure_employee_list()
+    return view
+
+
+def run_case(name: str, size: int, repeat: int, measure_memory: bool) -> dict:
+    setup = BENCHMARKS[name]
+    timings = []
+    peak = None
+    with tempfile.TemporaryDirectory() as workdir:
+        for _ in range(repeat):
+            run = setup(size, workdir)
+            gc.collect()
+            started = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - started)
+        if measure_memory:
+            run = setup(size, workdir)
+            gc.collect()
+            tracemalloc.start()
+            run()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    return {"case": name, "size": size, "seconds": min(timings), "peak_bytes": peak}
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: List[dict], baseline_path: str):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(row["case"], row["size"]): row for row in json.load(f)["results"]}
+    print(f"\n{'case':<28}{'size':>9}{'before s':>11}{'after s':>11}{'ratio':>8}")
+    for row in results:
+        before = baseline.get((row["case"], row["size"]))
+        if before is None:
+            continue
+        ratio = row["seconds"] / before["seconds"] if before["seconds"] else float("inf")
+        print(f"{row['case']:<28}{row['size']:>9}{before['seconds']:>11.4f}{row['seconds']:>11.4f}{ratio:>8.2f}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000])
+    parser.add_argument("--cases", nargs="+", choices=sorted(BENCHMARKS), default=sorted(BENCHMARKS))
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case; the best is kept")
+    parser.add_argument("--no-memory", action="store_true", help="skip the peak memory pass")
+    parser.add_argument("--no-qt", action="store_true", help="skip the view cases")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    args = parser.parse_args(argv)
+
+    results = []
+    print(f"{'case':<28}{'size':>9}{'seconds':>11}{'peak MiB':>10}")
+    for size in args.sizes:
+        for name in args.cases:
+            if args.no_qt and BENCHMARKS[name].qt:
+                continue
+            row = run_case(name, size, args.repeat, not args.no_memory)
+            results.append(row)
+            peak = f"{row['peak_bytes'] / 2 ** 20:.1f}" if row["peak_bytes"] is not None else "-"
+            print(f"{name:<28}{size:>9}{row['seconds']:>11.4f}{peak:>10}", flush=True)
+
+    if args.output:
+        report = {
+            "meta": {
+                "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+                "revision": git_revision(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "operations": OPERATIONS,
+            },
+            "results": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+# File: benchmarks/startup_time.py
+"""
+Measures application startup against rosters of several sizes. Each run
+is a fresh interpreter, so import costs are included; times are seconds
+since the process was spawned.
+
+    python benchmarks/startup_time.py
+    python benchmarks/startup_time.py --sizes 0 10000
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, ROOT)
+
+
+def write_roster(workdir: str, size: int):
+    from generators import generate_employees
+    from storage import JsonFileStore
+
+    os.makedirs(os.path.join(workdir, "departments"))
+    JsonFileStore(os.path.join(workdir, "departments", "HR.json")).save(generate_employees(size))
+
+
+def child_headless(started: float, workdir: str) -> dict:
+    from models import Department
+    imported = time.time()
+    Department("HR", data_file=os.path.join(workdir, "departments", "HR.json"))
+    loaded = time.time()
+    qt_loaded = any(name.startswith("PyQt6") for name in sys.modules)
+    return {"import": imported - started, "loaded": loaded - started, "qt_imported": qt_loaded}
+
+
+def child_gui(started: float, workdir: str) -> dict:
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    os.chdir(workdir)
+    from PyQt6.QtWidgets import QApplication
+    from persistence import PersistenceWorker
+    from views import EmployeeView
+    from controllers import EmployeeController
+    import main as app_main
+    imported = time.time()
+
+    app = QApplication([])
+    worker = PersistenceWorker()
+    view = EmployeeView()
+    view.show()
+    app.processEvents()
+    shown = time.time()
+    session = {}
+
+    def on_loaded(organization, department):
+        session["loaded"] = time.time()
+        session["organization"] = organization
+        EmployeeController(department, view, organization, worker)
+        view.tabs.setCurrentWidget(view.list_tab)
+        app.processEvents()
+        session["listed"] = time.time()
+        app.quit()
+
+    loader = app_main.SessionLoader()
+    loader.loaded.connect(on_loaded)
+    loader.failed.connect(lambda message: app.exit(1))
+    loader.start(worker)
+    app.exec()
+    loaded, listed = session["loaded"], session["listed"]
+    session["organization"].close()
+    worker.stop()
+    return {
+        "import": imported - started,
+        "window_shown": shown - started,
+        "data_loaded": loaded - started,
+        "list_shown": listed - started,
+    }
+
+
+def run_child(mode: str, workdir: str) -> dict:
+    started = time.time()
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", mode, workdir, repr(started)],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[0, 10000, 1000000])
+    parser.add_argument("--child", nargs=3, metavar=("MODE", "WORKDIR", "STARTED"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        mode, workdir, started = args.child
+        result = (child_gui if mode == "gui" else child_headless)(float(started), workdir)
+        print(json.dumps(result))
+        return 0
+
+    print(f"{'size':>9}{'models import':>15}{'headless load':>15}{'Qt imports':>12}"
+          f"{'window shown':>14}{'data loaded':>13}{'list shown':>12}")
+    for size in args.sizes:
+        workdir = tempfile.mkdtemp(prefix="ems-startup-")
+        try:
+            write_roster(workdir, size)
+            headless = run_child("headless", workdir)
+            gui = run_child("gui", workdir)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        print(f"{size:>9}{headless['import']:>15.3f}{headless['loaded']:>15.3f}"
+              f"{'yes' if headless['qt_imported'] else 'no':>12}{gui['window_shown']:>14.3f}"
+              f"{gui['data_loaded']:>13.3f}{gui['list_shown']:>12.3f}", flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
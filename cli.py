@@ -0,0 +1,250 @@
+# File: cli.py
+"""
+Headless bulk import/export of employees, without starting Qt.
+
+    python cli.py import hires.csv
+    python cli.py --department Sales export sales.csv
+    python cli.py import acquisition.jsonl --workers 4
+    python cli.py export roster.csv
+    python cli.py stats
+    python cli.py duplicates --threshold 0.9 --output duplicates.json
+    python cli.py snapshot
+    python cli.py snapshot --to-json restored.json
+"""
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Iterator, List, Tuple
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+from duplicates import DEFAULT_THRESHOLD, find_duplicates
+from models import Department
+from organization import department_data_file
+from snapshot import Snapshot, snapshot_path, source_version, write_snapshot
+from stats import PayrollStats
+from storage import JsonFileStore
+from validation import FIELDS, validate_batch
+
+
+def detect_format(path: str, requested: str = None) -> str:
+    if requested:
+        return requested
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".jsonl", ".ndjson"):
+        return "jsonl"
+    if extension == ".csv":
+        return "csv"
+    raise ValueError(f"Cannot tell the format of '{path}', pass --format csv or --format jsonl.")
+
+
+def _open(path: str, mode: str):
+    if path == "-":
+        return sys.stdin if "r" in mode else sys.stdout
+    return open(path, mode, encoding="utf-8", newline="")
+
+
+def read_records(f, fmt: str) -> Iterator[Tuple[int, dict]]:
+    """
+    Streams (line number, raw record) pairs from a CSV or JSON Lines file.
+    A JSONL line that is not a JSON object is yielded as an empty record so
+    it is reported by validation.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(f)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for line_no, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield line_no, record if isinstance(record, dict) else {}
+
+
+def _batches(records: Iterator[Tuple[int, dict]], batch_size: int) -> Iterator[List[Tuple[int, dict]]]:
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def _validated_batches(batches: Iterator[List[Tuple[int, dict]]], executor: ProcessPoolExecutor,
+                       workers: int) -> Iterator[tuple]:
+    # Executor.map() would read and submit the whole file up front; keeping
+    # a couple of batches per worker in flight bounds what is held in memory
+    in_flight = deque()
+    for batch in batches:
+        in_flight.append(executor.submit(validate_batch, batch))
+        if len(in_flight) >= 2 * workers:
+            yield in_flight.popleft().result()
+    while in_flight:
+        yield in_flight.popleft().result()
+
+
+def import_employees(department: Department, path: str, fmt: str,
+                     batch_size: int = 10000, workers: int = 0, errors=sys.stderr) -> Tuple[int, int]:
+    """
+    Validates every record of the file and adds the valid ones to the
+    department in a single transaction. Returns (imported, rejected).
+    """
+    imported = 0
+    rejected = 0
+    with _open(path, "r") as f:
+        batches = _batches(read_records(f, fmt), batch_size)
+        executor = ProcessPoolExecutor(workers) if workers > 1 else None
+        try:
+            results = _validated_batches(batches, executor, workers) if executor else map(validate_batch, batches)
+            with department.transaction():
+                for valid, invalid in results:
+                    for line_no, field_errors in invalid:
+                        for field, message in field_errors.items():
+                            print(f"{path}:{line_no}: {field}: {message}", file=errors)
+                    rejected += len(invalid)
+                    batch = []
+                    seen = set()
+                    for line_no, employee in valid:
+                        if employee.emp_id in seen or department.has_employee(employee.emp_id):
+                            print(f"{path}:{line_no}: emp_id: Employee ID already exists.", file=errors)
+                            rejected += 1
+                            continue
+                        seen.add(employee.emp_id)
+                        batch.append(employee)
+                    department.add_employees(batch)
+                    imported += len(batch)
+        finally:
+            if executor:
+                executor.shutdown()
+    return imported, rejected
+
+
+def export_employees(department: Department, path: str, fmt: str) -> int:
+    count = 0
+    with _open(path, "w") as f:
+        if fmt == "csv":
+            writer = csv.writer(f)
+            writer.writerow(FIELDS)
+            for emp in department.list_employees():
+                writer.writerow((emp.emp_id, emp.name, emp.birthday, emp.salary_rate))
+                count += 1
+        else:
+            for emp in department.list_employees():
+                f.write(json.dumps(emp.to_dict(), ensure_ascii=False) + "\n")
+                count += 1
+    return count
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Employee Management System bulk tools")
+    parser.add_argument("--data-dir", default="departments",
+                        help="directory of department files shared with the GUI")
+    parser.add_argument("--department", default="HR", help="department name")
+    parser.add_argument("--data-file",
+                        help="use this data file (.json, or .db for SQLite) instead of the department's file")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import", help="add employees from a CSV or JSONL file")
+    import_parser.add_argument("path", help="file to read, or - for stdin")
+    import_parser.add_argument("--format", choices=("csv", "jsonl"))
+    import_parser.add_argument("--batch-size", type=int, default=10000,
+                               help="records validated per batch")
+    import_parser.add_argument("--workers", type=int, default=0,
+                               help="validate batches across this many processes")
+
+    export_parser = commands.add_parser("export", help="write all employees to a CSV or JSONL file")
+    export_parser.add_argument("path", help="file to write, or - for stdout")
+    export_parser.add_argument("--format", choices=("csv", "jsonl"))
+
+    stats_parser = commands.add_parser("stats", help="print payroll statistics as JSON")
+    stats_parser.add_argument("--band-width", type=float, default=10.0,
+                              help="width of the salary bands")
+
+    duplicates_parser = commands.add_parser("duplicates", help="report likely duplicate employees as JSON")
+    duplicates_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                                   help="lowest score (0-1) reported")
+    duplicates_parser.add_argument("--output", default="-", help="file to write, or - for stdout")
+
+    snapshot_parser = commands.add_parser("snapshot", help="rebuild the binary snapshot of the data file")
+    snapshot_parser.add_argument("--to-json", metavar="PATH",
+                                 help="instead write the snapshot's employees to a JSON data file")
+    return parser
+
+
+def build_snapshot(data_file: str, department_name: str) -> int:
+    department = Department(department_name, data_file=data_file)
+    if not isinstance(department.storage, JsonFileStore):
+        raise ValueError("Snapshots are only kept for JSON data files.")
+    employees = department.list_employees()
+    write_snapshot(snapshot_path(data_file), employees, source_version(data_file))
+    return len(employees)
+
+
+def restore_snapshot(data_file: str, path: str) -> int:
+    with Snapshot(snapshot_path(data_file)) as snapshot:
+        employees = snapshot.employees()
+    JsonFileStore(path, snapshot=False).save(employees)
+    return len(employees)
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        if args.data_file is None:
+            args.data_file = department_data_file(args.data_dir, args.department)
+        if args.command == "stats":
+            department = Department(args.department, data_file=args.data_file)
+            summary = PayrollStats(department.list_employees(), band_width=args.band_width).summary()
+            json.dump(summary, sys.stdout, ensure_ascii=False, indent=2)
+            print()
+            return 0
+        if args.command == "duplicates":
+            department = Department(args.department, data_file=args.data_file)
+            started = time.perf_counter()
+            report = find_duplicates(department.list_employees(), threshold=args.threshold)
+            elapsed = time.perf_counter() - started
+            with _open(args.output, 'w') as f:
+                json.dump(report.to_dict(), f, ensure_ascii=False, indent=2)
+                f.write("\n")
+            print(f"Found {len(report.pairs)} possible duplicates among {report.records} employees "
+                  f"({report.candidates} pairs compared) in {elapsed:.2f}s.", file=sys.stderr)
+            return 0
+        if args.command == "snapshot":
+            if args.to_json:
+                count = restore_snapshot(args.data_file, args.to_json)
+                print(f"Wrote {count} employees to {args.to_json}.", file=sys.stderr)
+            else:
+                count = build_snapshot(args.data_file, args.department)
+                print(f"Wrote a snapshot of {count} employees to {snapshot_path(args.data_file)}.",
+                      file=sys.stderr)
+            return 0
+        fmt = detect_format(args.path, args.format)
+        department = Department(args.department, data_file=args.data_file)
+        started = time.perf_counter()
+        if args.command == "import":
+            imported, rejected = import_employees(
+                department, args.path, fmt, batch_size=args.batch_size, workers=args.workers
+            )
+            elapsed = time.perf_counter() - started
+            print(f"Imported {imported} employees, rejected {rejected} records in {elapsed:.2f}s.",
+                  file=sys.stderr)
+            return 1 if rejected else 0
+        count = export_employees(department, args.path, fmt)
+        elapsed = time.perf_counter() - started
+        print(f"Exported {count} employees in {elapsed:.2f}s.", file=sys.stderr)
+        return 0
+    except (IOError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,43 @@
+# File: collation.py
+
+from typing import Tuple
+import unicodedata
+
+# Vietnamese alphabet order; f, j, w and z only appear in foreign names
+_ALPHABET = "aăâbcdđeêfghijklmnoôơpqrstuưvwxyz"
+# Letters are weighted above punctuation, digits and the space, so "An"
+# sorts before "Anh" and "Ân"
+_LETTER_BASE = 0xE000
+_WEIGHTS = {letter: chr(_LETTER_BASE + i) for i, letter in enumerate(_ALPHABET)}
+
+# Combining marks that make a different letter (ă, â, ê, ô, ơ, ư)
+_LETTER_MARKS = {
+    "\u0306": {"a": "ă"},
+    "\u0302": {"a": "â", "e": "ê", "o": "ô"},
+    "\u031b": {"o": "ơ", "u": "ư"},
+}
+# Tones in dictionary order: ngang (none), huyền, hỏi, ngã, sắc, nặng
+_TONES = {"\u0300": "1", "\u0309": "2", "\u0303": "3", "\u0301": "4", "\u0323": "5"}
+
+
+def vietnamese_sort_key(text: str) -> Tuple[str, str, str]:
+    """
+    Collation key for Vietnamese text: letters compare in alphabet order
+    (a < ă < â < b ... d < đ), then by tone, with the text itself as the
+    tie-break.
+    """
+    letters = []
+    tones = []
+    for char in unicodedata.normalize("NFD", text.casefold()):
+        if unicodedata.combining(char):
+            if char in _TONES and tones:
+                tones[-1] = _TONES[char]
+            elif char in _LETTER_MARKS and letters:
+                letter = _LETTER_MARKS[char].get(letters[-1])
+                if letter is not None:
+                    letters[-1] = letter
+            continue
+        letters.append(char)
+        tones.append("0")
+    primary = "".join([_WEIGHTS.get(letter, letter) for letter in letters])
+    return primary, "".join(tones), text
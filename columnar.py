@@ -0,0 +1,120 @@
+# File: columnar.py
+
+from array import array
+from typing import Dict, Iterable, Iterator, List
+import datetime
+import sys
+
+from models import Employee
+
+
+def birthday_to_ordinal(birthday: str) -> int:
+    """
+    Packs a "DD/MM/YYYY" birthday into a date ordinal, or returns 0 when the
+    string is not in exactly that form (so it could not be restored as-is).
+    """
+    if len(birthday) != 10 or birthday[2] != "/" or birthday[5] != "/":
+        return 0
+    try:
+        return datetime.date(int(birthday[6:]), int(birthday[3:5]), int(birthday[:2])).toordinal()
+    except ValueError:
+        return 0
+
+
+def ordinal_to_birthday(ordinal: int) -> str:
+    date = datetime.date.fromordinal(ordinal)
+    return f"{date.day:02d}/{date.month:02d}/{date.year:04d}"
+
+
+class EmployeeTable:
+    """
+    Column-oriented, list-like container of employees. Salaries live in an
+    array('d') and birthdays as packed date ordinals in an array('l'), so a
+    record costs a few machine words plus its two strings instead of a full
+    object. Indexing and iteration hand out Employee views built on the fly;
+    assigning an Employee stores its fields back into the columns.
+    """
+
+    def __init__(self, employees: Iterable[Employee] = ()):
+        self._ids: List[str] = []
+        self._names: List[str] = []
+        self._birthdays = array('l')
+        self._salaries = array('d')
+        # Birthdays that are not strict DD/MM/YYYY, kept verbatim by emp_id
+        self._raw_birthdays: Dict[str, str] = {}
+        self.extend(employees)
+
+    @property
+    def emp_ids(self) -> List[str]:
+        return self._ids
+
+    @property
+    def salaries(self) -> array:
+        return self._salaries
+
+    @property
+    def birthday_ordinals(self) -> array:
+        """Date ordinals per row; 0 marks a birthday that is not DD/MM/YYYY."""
+        return self._birthdays
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self._row(row) for row in range(*position.indices(len(self._ids)))]
+        if position < 0:
+            position += len(self._ids)
+        return self._row(position)
+
+    def _row(self, row: int) -> Employee:
+        emp_id = self._ids[row]
+        ordinal = self._birthdays[row]
+        birthday = ordinal_to_birthday(ordinal) if ordinal else self._raw_birthdays[emp_id]
+        return Employee(emp_id, self._names[row], birthday, self._salaries[row])
+
+    def __iter__(self) -> Iterator[Employee]:
+        for row in range(len(self._ids)):
+            yield self._row(row)
+
+    def __setitem__(self, position: int, employee: Employee):
+        if position < 0:
+            position += len(self._ids)
+        self._raw_birthdays.pop(self._ids[position], None)
+        ordinal = birthday_to_ordinal(employee.birthday)
+        if not ordinal:
+            self._raw_birthdays[employee.emp_id] = employee.birthday
+        self._ids[position] = employee.emp_id
+        self._names[position] = sys.intern(employee.name)
+        self._birthdays[position] = ordinal
+        self._salaries[position] = employee.salary_rate
+
+    def append(self, employee: Employee):
+        ordinal = birthday_to_ordinal(employee.birthday)
+        if not ordinal:
+            self._raw_birthdays[employee.emp_id] = employee.birthday
+        self._ids.append(employee.emp_id)
+        self._names.append(sys.intern(employee.name))
+        self._birthdays.append(ordinal)
+        self._salaries.append(employee.salary_rate)
+
+    def extend(self, employees: Iterable[Employee]):
+        for employee in employees:
+            self.append(employee)
+
+    def pop(self) -> Employee:
+        employee = self._row(len(self._ids) - 1)
+        self._raw_birthdays.pop(self._ids.pop(), None)
+        self._names.pop()
+        self._birthdays.pop()
+        self._salaries.pop()
+        return employee
+
+    def copy(self) -> "EmployeeTable":
+        table = EmployeeTable()
+        table._ids = self._ids.copy()
+        table._names = self._names.copy()
+        table._birthdays = array('l', self._birthdays)
+        table._salaries = array('d', self._salaries)
+        table._raw_birthdays = dict(self._raw_birthdays)
+        return table
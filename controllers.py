@@ -1,143 +1,154 @@
 # File: controllers.py
 
-from models import Department, Employee
+from duplicates import DuplicateReport, find_duplicates
+from indexes import RangeFilter, RosterIndexes
+from instrumentation import metrics, timed
+from models import MAX_ROW_MERGE, ChangeBatch, Department, EmployeePage
+from organization import Organization
+from persistence import PersistenceWorker
+from search import SearchIndex
+from stats import PayrollStats
+from validation import validate_record
 from views import EmployeeView
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
 from PyQt6.QtWidgets import QMessageBox
-import datetime
 import logging
+import threading
+
+# How often the data file is checked for changes made by other instances
+WATCH_INTERVAL_MS = 2000
+
+
+class PersistenceSignals(QObject):
+    # Emitted from the writer thread, delivered on the GUI thread
+    failed = pyqtSignal(str)
+
+
+class DuplicateScanSignals(QObject):
+    # Emitted from the scan thread, delivered on the GUI thread
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
 
 
 class EmployeeController:
-    def __init__(self, department: Department, view: EmployeeView):
+    def __init__(self, department: Department, view: EmployeeView, organization: Organization = None,
+                 persistence_worker: PersistenceWorker = None):
         self.department = department
         self.view = view
+        self.organization = organization
+        self.persistence_signals = PersistenceSignals()
+        self.persistence_signals.failed.connect(self.on_persistence_failed)
+        if persistence_worker is not None:
+            persistence_worker.add_error_listener(lambda e: self.persistence_signals.failed.emit(str(e)))
+        # Built on the first search, then kept up to date from change events
+        self.search_index = None
+        self.search_query = ""
+        # Salary and birthday indexes, built on the first range filter
+        self.roster_indexes = None
+        self.range_filter = RangeFilter()
+        # IDs matching the active search and range filters, None when the
+        # list is unfiltered
+        self.search_results = None
+        # Built when first shown, then kept current by change events
+        self.payroll_stats = None
+        # Duplicate detection runs off the GUI thread, one scan at a time
+        self.duplicate_scan = None
+        self.duplicate_signals = DuplicateScanSignals()
+        self.duplicate_signals.finished.connect(self.on_duplicates_found)
+        self.duplicate_signals.failed.connect(self.on_duplicate_scan_failed)
+        # Other instances may share the data file; poll it rather than rely
+        # on change notifications, which network volumes often lack
+        self.watch_timer = QTimer()
+        self.watch_timer.setInterval(WATCH_INTERVAL_MS)
+        self.watch_timer.timeout.connect(self.check_external_changes)
+        self.watch_timer.start()
         self.bind_buttons()
-        self.view.display_employees(self.department.list_employees())
+        self.display_roster()
+        self.department.subscribe(self.on_department_changed, batched=True)
+        if self.organization is not None:
+            self.view.set_departments(self.organization.department_names(), self.department.name)
 
     def bind_buttons(self):
         self.view.set_add_employee_command(self.add_employee)
         self.view.set_update_employee_command(self.update_employee)
         self.view.set_delete_employee_command(self.delete_employee)
         self.view.set_list_employees_command(self.list_employees)
+        self.view.set_show_employee_list_command(self.list_employees)
+        self.view.set_search_employees_command(self.search_employees)
+        self.view.set_show_statistics_command(self.show_statistics)
+        self.view.set_find_duplicates_command(self.show_duplicates)
+        self.view.set_switch_department_command(self.switch_department)
+        self.view.set_new_department_command(self.new_department)
+        self.view.set_collect_metrics_command(self.set_collect_metrics)
+        self.view.set_profile_next_command(self.profile_next_action)
+        self.view.set_export_metrics_command(self.export_metrics)
 
+    @timed("controller.add_employee")
     def add_employee(self):
-        details = self.view.get_employee_details()
-        emp_id = details['emp_id']
-        name = details['name']
-        birthday = details['birthday']
-        salary_rate_str = details['salary_rate']
-
-        # Clear previous highlights
-        self.view.clear_highlights()
-
-        # Validate inputs
-        valid = True
-        if not emp_id:
-            self.view.highlight_input(self.view.emp_id_input, False)
-            valid = False
-        if not name:
-            self.view.highlight_input(self.view.name_input, False)
-            valid = False
-        if not self.validate_birthday(birthday):
-            self.view.highlight_input(self.view.birthday_input, False)
-            valid = False
-        if not self.validate_salary(salary_rate_str):
-            self.view.highlight_input(self.view.salary_input, False)
-            valid = False
-
-        if not valid:
-            self.show_error("Please correct the highlighted fields.")
-            return
-
-        try:
-            salary_rate = float(salary_rate_str)
-        except ValueError:
-            self.show_error("Salary Rate must be a valid number.")
+        new_employee = self.validate_details()
+        if new_employee is None:
             return
 
         # Add employee
         try:
-            new_employee = Employee(emp_id, name, birthday, salary_rate)
             self.department.add_employee(new_employee)
-            self.view.display_employees(self.department.list_employees())
             QMessageBox.information(self.view, "Success", "Employee added successfully.")
             self.clear_inputs()
-            logging.info(f"Added employee: {new_employee.emp_id} - {new_employee.name}")
+            logging.info("Added employee: %s - %s", new_employee.emp_id, new_employee.name,
+                         extra={'emp_id': new_employee.emp_id, 'operation': 'add'})
         except ValueError as ve:
+            metrics.increment("controller.add_employee.failures")
             self.show_error(str(ve))
-            logging.error(f"Error adding employee: {str(ve)}")
+            logging.error("Error adding employee: %s", ve,
+                          extra={'emp_id': new_employee.emp_id, 'operation': 'add'})
         except Exception as e:
+            metrics.increment("controller.add_employee.failures")
             self.show_error(f"An unexpected error occurred: {str(e)}")
-            logging.error(f"Unexpected error adding employee: {str(e)}")
+            logging.error("Unexpected error adding employee: %s", e,
+                          extra={'emp_id': new_employee.emp_id, 'operation': 'add'})
 
+    @timed("controller.update_employee")
     def update_employee(self):
-        selected_index = self.view.get_selected_employee_index()
-        if selected_index == -1:
+        current_emp = self.view.get_selected_employee()
+        if current_emp is None:
             self.show_error("No employee selected.")
             return
 
-        current_emp = self.department.employees[selected_index]
-        details = self.view.get_employee_details()
-        emp_id = details['emp_id']
-        name = details['name']
-        birthday = details['birthday']
-        salary_rate_str = details['salary_rate']
-
-        # Clear previous highlights
-        self.view.clear_highlights()
-
-        # Validate inputs
-        valid = True
-        if not emp_id:
-            self.view.highlight_input(self.view.emp_id_input, False)
-            valid = False
-        if not name:
-            self.view.highlight_input(self.view.name_input, False)
-            valid = False
-        if not self.validate_birthday(birthday):
-            self.view.highlight_input(self.view.birthday_input, False)
-            valid = False
-        if not self.validate_salary(salary_rate_str):
-            self.view.highlight_input(self.view.salary_input, False)
-            valid = False
-
-        if not valid:
-            self.show_error("Please correct the highlighted fields.")
+        updated_employee = self.validate_details()
+        if updated_employee is None:
             return
 
-        try:
-            salary_rate = float(salary_rate_str)
-        except ValueError:
-            self.show_error("Salary Rate must be a valid number.")
-            return
-
-        if emp_id != current_emp.emp_id and any(emp.emp_id == emp_id for emp in self.department.employees):
+        emp_id = updated_employee.emp_id
+        if emp_id != current_emp.emp_id and self.department.has_employee(emp_id):
             self.show_error("Employee ID already exists.")
             self.view.highlight_input(self.view.emp_id_input, False)
             return
 
         # Update employee
         try:
-            updated_employee = Employee(emp_id, name, birthday, salary_rate)
-            self.department.update_employee(updated_employee)
-            self.view.display_employees(self.department.list_employees())
+            self.department.update_employee(updated_employee, current_emp.emp_id)
             QMessageBox.information(self.view, "Success", "Employee updated successfully.")
             self.clear_inputs()
-            logging.info(f"Updated employee: {updated_employee.emp_id} - {updated_employee.name}")
+            logging.info("Updated employee: %s - %s", updated_employee.emp_id, updated_employee.name,
+                         extra={'emp_id': updated_employee.emp_id, 'operation': 'update'})
         except ValueError as ve:
+            metrics.increment("controller.update_employee.failures")
             self.show_error(str(ve))
-            logging.error(f"Error updating employee: {str(ve)}")
+            logging.error("Error updating employee: %s", ve,
+                          extra={'emp_id': current_emp.emp_id, 'operation': 'update'})
         except Exception as e:
+            metrics.increment("controller.update_employee.failures")
             self.show_error(f"An unexpected error occurred: {str(e)}")
-            logging.error(f"Unexpected error updating employee: {str(e)}")
+            logging.error("Unexpected error updating employee: %s", e,
+                          extra={'emp_id': current_emp.emp_id, 'operation': 'update'})
 
+    @timed("controller.delete_employee")
     def delete_employee(self):
-        selected_index = self.view.get_selected_employee_index()
-        if selected_index == -1:
+        emp = self.view.get_selected_employee()
+        if emp is None:
             self.show_error("No employee selected.")
             return
 
-        emp = self.department.employees[selected_index]
         confirm = QMessageBox.question(
             self.view,
             "Confirm Delete",
@@ -147,25 +158,212 @@ class EmployeeController:
         if confirm == QMessageBox.StandardButton.Yes:
             try:
                 self.department.remove_employee(emp.emp_id)
-                self.view.display_employees(self.department.list_employees())
                 QMessageBox.information(self.view, "Success", "Employee deleted successfully.")
                 self.clear_inputs()
-                logging.info(f"Deleted employee: {emp.emp_id} - {emp.name}")
+                logging.info("Deleted employee: %s - %s", emp.emp_id, emp.name,
+                             extra={'emp_id': emp.emp_id, 'operation': 'delete'})
             except ValueError as ve:
+                metrics.increment("controller.delete_employee.failures")
                 self.show_error(str(ve))
-                logging.error(f"Error deleting employee: {str(ve)}")
+                logging.error("Error deleting employee: %s", ve,
+                              extra={'emp_id': emp.emp_id, 'operation': 'delete'})
             except Exception as e:
+                metrics.increment("controller.delete_employee.failures")
                 self.show_error(f"An unexpected error occurred: {str(e)}")
-                logging.error(f"Unexpected error deleting employee: {str(e)}")
+                logging.error("Unexpected error deleting employee: %s", e,
+                              extra={'emp_id': emp.emp_id, 'operation': 'delete'})
+
+    def on_department_changed(self, batch: ChangeBatch):
+        if batch.is_reset or len(batch) > MAX_ROW_MERGE:
+            # Rebuilding once beats applying a long run of row changes
+            self.search_index = None
+            self.roster_indexes = None
+            self.display_roster()
+            if self.search_results is not None:
+                self.search_employees()
+            return
+        for event in batch:
+            if self.search_index is not None:
+                self.search_index.apply_change(event)
+            if self.roster_indexes is not None:
+                self.roster_indexes.apply_change(event)
+            if self.search_results is not None:
+                # Keep the active search result current before the row changes
+                if event.old is not None:
+                    self.search_results.discard(event.old.emp_id)
+                if event.new is not None and self.matches_filters(event.new):
+                    self.search_results.add(event.new.emp_id)
+            self.view.apply_change(event)
 
+    def matches_filters(self, emp) -> bool:
+        if self.search_query.strip() and not self.search_index.matches(self.search_query, emp):
+            return False
+        return RosterIndexes.matches(self.range_filter, emp)
+
+    def check_external_changes(self):
+        try:
+            if not self.department.storage.changed_externally():
+                return
+            changed = self.department.refresh()
+        except Exception as e:
+            # Retried on the next tick; a dialog every interval would be noise
+            logging.error("Error merging external changes: %s", e,
+                          extra={'department': self.department.name, 'operation': 'refresh'})
+            return
+        if changed:
+            logging.info("Merged %d changes made by another instance.", changed,
+                         extra={'department': self.department.name, 'operation': 'refresh'})
+
+    def on_persistence_failed(self, message: str):
+        metrics.increment("persistence.write.failures")
+        self.show_error(f"Failed to save employees: {message}")
+        logging.error("Background save failed: %s", message, extra={'operation': 'save'})
+
+    @timed("controller.search_employees")
+    def search_employees(self):
+        query = self.view.get_search_text()
+        self.search_query = query
+        self.range_filter = RangeFilter(**self.view.get_range_filters())
+        results = None
+        if query.strip():
+            if self.search_index is None:
+                self.search_index = SearchIndex(self.department.list_employees())
+            results = self.search_index.search(query)
+        if not self.range_filter.is_empty():
+            if self.roster_indexes is None:
+                self.roster_indexes = RosterIndexes(self.department.list_employees())
+            in_range = self.roster_indexes.query(self.range_filter)
+            results = in_range if results is None else results & in_range
+        self.search_results = results
+        self.view.show_search_results(self.search_results)
+
+    def display_roster(self):
+        # The table pulls rows a page at a time as it is scrolled
+        self.view.display_pages(self.fetch_page)
+
+    def fetch_page(self, after, limit: int) -> EmployeePage:
+        return self.department.page(after, limit, self.search_results)
+
+    @timed("controller.list_employees")
     def list_employees(self):
         try:
-            employees = self.department.list_employees()
-            self.view.display_employees(employees)
-            logging.info("Listed all employees.")
+            self.display_roster()
+            logging.info("Listed all employees.", extra={'operation': 'list'})
         except Exception as e:
+            metrics.increment("controller.list_employees.failures")
             self.show_error(f"An error occurred while listing employees: {str(e)}")
-            logging.error(f"Error listing employees: {str(e)}")
+            logging.error("Error listing employees: %s", e, extra={'operation': 'list'})
+
+    @timed("controller.switch_department")
+    def switch_department(self, name: str):
+        if self.organization is None or name == self.department.name:
+            return
+        try:
+            department = self.organization.get_department(name)
+        except Exception as e:
+            metrics.increment("controller.switch_department.failures")
+            self.show_error(f"An error occurred while opening department: {str(e)}")
+            logging.error("Error opening department %s: %s", name, e,
+                          extra={'department': name, 'operation': 'switch_department'})
+            self.view.set_departments(self.organization.department_names(), self.department.name)
+            return
+        # Derived data belongs to the previous department
+        self.department.unsubscribe(self.on_department_changed, batched=True)
+        if self.payroll_stats is not None:
+            self.payroll_stats.detach()
+            self.payroll_stats = None
+        self.search_index = None
+        self.roster_indexes = None
+        self.department = department
+        self.department.subscribe(self.on_department_changed, batched=True)
+        self.display_roster()
+        if self.search_results is not None:
+            self.search_employees()
+        self.view.set_departments(self.organization.department_names(), self.department.name)
+        logging.info("Switched to department: %s", name,
+                     extra={'department': name, 'operation': 'switch_department'})
+
+    @timed("controller.new_department")
+    def new_department(self):
+        if self.organization is None:
+            return
+        name = self.view.ask_department_name()
+        if not name:
+            return
+        try:
+            self.organization.create_department(name)
+            logging.info("Created department: %s", name,
+                         extra={'department': name, 'operation': 'create_department'})
+        except ValueError as ve:
+            metrics.increment("controller.new_department.failures")
+            self.show_error(str(ve))
+            logging.error("Error creating department: %s", ve,
+                          extra={'department': name, 'operation': 'create_department'})
+            return
+        self.switch_department(name)
+
+    @timed("controller.show_statistics")
+    def show_statistics(self):
+        try:
+            if self.payroll_stats is None:
+                self.payroll_stats = PayrollStats.for_department(self.department)
+            self.view.show_statistics(self.payroll_stats.summary())
+            logging.info("Showed payroll statistics.", extra={'operation': 'statistics'})
+        except Exception as e:
+            metrics.increment("controller.show_statistics.failures")
+            self.show_error(f"An error occurred while computing statistics: {str(e)}")
+            logging.error("Error computing statistics: %s", e, extra={'operation': 'statistics'})
+
+    @timed("controller.show_duplicates")
+    def show_duplicates(self):
+        if self.duplicate_scan is not None and self.duplicate_scan.is_alive():
+            return
+        # The scan works on a copy, so edits made meanwhile do not race it
+        employees = list(self.department.list_employees())
+        self.view.show_status("Looking for possible duplicates...")
+        self.duplicate_scan = threading.Thread(target=self._scan_duplicates, args=(employees,),
+                                               name="duplicate-scan", daemon=True)
+        self.duplicate_scan.start()
+
+    def _scan_duplicates(self, employees):
+        try:
+            report = find_duplicates(employees)
+        except Exception as e:
+            self.duplicate_signals.failed.emit(str(e))
+            return
+        self.duplicate_signals.finished.emit(report)
+
+    def on_duplicates_found(self, report: DuplicateReport):
+        self.view.show_status("")
+        self.view.show_duplicates(report.to_dict())
+        logging.info("Found %d possible duplicates among %d employees.", len(report.pairs), report.records,
+                     extra={'department': self.department.name, 'operation': 'duplicates'})
+
+    def on_duplicate_scan_failed(self, message: str):
+        self.view.show_status("")
+        metrics.increment("controller.show_duplicates.failures")
+        self.show_error(f"An error occurred while looking for duplicates: {message}")
+        logging.error("Error looking for duplicates: %s", message, extra={'operation': 'duplicates'})
+
+    def set_collect_metrics(self, enabled: bool):
+        metrics.enabled = enabled
+        logging.info("Metrics collection %s.", "enabled" if enabled else "disabled", extra={'operation': 'metrics'})
+
+    def profile_next_action(self):
+        metrics.profile_next("controller.")
+        self.view.show_info("Profile Next Action",
+                           f"The next action will be profiled and saved to '{metrics.profile_dir}'.")
+
+    def export_metrics(self):
+        path = self.view.ask_metrics_path()
+        if not path:
+            return
+        try:
+            metrics.dump(path)
+            logging.info("Exported metrics to %s", path, extra={'operation': 'metrics'})
+        except Exception as e:
+            self.show_error(f"An error occurred while exporting metrics: {str(e)}")
+            logging.error("Error exporting metrics: %s", e, extra={'operation': 'metrics'})
 
     def clear_inputs(self):
         self.view.emp_id_input.clear()
@@ -174,19 +372,18 @@ class EmployeeController:
         self.view.salary_input.clear()
         self.view.clear_highlights()
 
-    def validate_birthday(self, birthday: str) -> bool:
-        try:
-            datetime.datetime.strptime(birthday, "%d/%m/%Y")
-            return True
-        except ValueError:
-            return False
-
-    def validate_salary(self, salary: str) -> bool:
-        try:
-            salary_float = float(salary)
-            return salary_float >= 0
-        except ValueError:
-            return False
+    def validate_details(self):
+        """
+        Validates the form with the shared rules and highlights the bad
+        fields. Returns the Employee, or None after reporting the errors.
+        """
+        self.view.clear_highlights()
+        employee, errors = validate_record(self.view.get_employee_details())
+        if errors:
+            self.view.highlight_fields(errors)
+            self.show_error("Please correct the highlighted fields.\n\n" + "\n".join(errors.values()))
+            return None
+        return employee
 
     def show_error(self, message: str):
         QMessageBox.critical(self.view, "Error", message)
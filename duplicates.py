@@ -0,0 +1,216 @@
+# File: duplicates.py
+
+from dataclasses import dataclass, field
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import gc
+import re
+
+from models import Employee
+from search import fold_text
+from validation import parse_birthday
+
+# Blocks larger than this are not compared pairwise; their members are
+# sorted by ID and each is compared with the next WINDOW members only
+MAX_BLOCK = 50
+WINDOW = 5
+DEFAULT_THRESHOLD = 0.85
+
+NAME_WEIGHT = 0.6
+BIRTHDAY_WEIGHT = 0.3
+SALARY_WEIGHT = 0.1
+# Added when the IDs differ only in case, punctuation or zero padding
+ID_BONUS = 0.1
+
+_ID_NOISE = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_id(emp_id: str) -> str:
+    """
+    "EMP-0042" and "emp42" both become "emp42".
+    """
+    return re.sub(r"(?<![0-9])0+(?=[0-9])", "", _ID_NOISE.sub("", emp_id.casefold()))
+
+
+def birthday_parts(birthday: str) -> Tuple:
+    """
+    (day, month, year) of a birthday as validation reads it, so "5/3/1990"
+    and "05/03/1990" agree. Dates that do not parse, e.g. with the day and
+    month swapped, fall back to the "/"-separated parts of the raw text.
+    """
+    date = parse_birthday(birthday)
+    if date is not None:
+        return date.day, date.month, date.year
+    return tuple(int(part) if part.isdigit() else part for part in birthday.split("/"))
+
+
+@dataclass
+class DuplicatePair:
+    first: Employee
+    second: Employee
+    score: float
+    reasons: List[str]
+
+    def to_dict(self) -> dict:
+        return {
+            'first': self.first.to_dict(),
+            'second': self.second.to_dict(),
+            'score': round(self.score, 3),
+            'reasons': self.reasons,
+        }
+
+
+@dataclass
+class DuplicateReport:
+    records: int
+    candidates: int
+    threshold: float
+    pairs: List[DuplicatePair] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return {
+            'records': self.records,
+            'candidates': self.candidates,
+            'threshold': self.threshold,
+            'pairs': [pair.to_dict() for pair in self.pairs],
+        }
+
+
+def candidate_pairs(employees: List[Employee], folded: List[str], ids: List[str],
+                    dates: List[Tuple]) -> Set[Tuple[int, int]]:
+    """
+    Row pairs sharing a blocking key, given the folded names, normalized
+    IDs and birthday_parts() of the rows. Each record has a handful of keys and blocks are
+    capped, so this is linear in the roster rather than quadratic.
+    """
+    # Most keys belong to a single record, so only the first row is kept
+    # per key and a block list is made on the first collision
+    first_rows: Dict[Tuple, int] = {}
+    blocks: Dict[Tuple, List[int]] = {}
+    for row, emp in enumerate(employees):
+        tokens = folded[row].split()
+        name = " ".join(tokens)
+        date = dates[row]
+        if len(date) == 3:
+            day, month, year = date
+        else:
+            day, month, year = emp.birthday, None, None
+        keys = [
+            # Accent and spacing variants of one name, allowing a typo in
+            # the day or the month, or the two swapped
+            ('month', name, year, month),
+            ('day', name, year, day),
+            ('swap', name, year, frozenset((day, month))),
+            # The same ID written differently
+            ('id', ids[row]),
+        ]
+        if tokens:
+            # Same birthday, family and given name, allowing the middle
+            # name to differ or be left out
+            keys.append(('given', tokens[0], tokens[-1], date))
+        for key in keys:
+            first = first_rows.setdefault(key, row)
+            if first != row:
+                block = blocks.get(key)
+                if block is None:
+                    blocks[key] = [first, row]
+                else:
+                    block.append(row)
+    pairs = set()
+    for rows in blocks.values():
+        if len(rows) <= MAX_BLOCK:
+            pairs.update((a, b) for i, a in enumerate(rows) for b in rows[i + 1:])
+        else:
+            rows = sorted(rows, key=lambda row: employees[row].emp_id)
+            pairs.update((min(a, b), max(a, b))
+                         for i, a in enumerate(rows) for b in rows[i + 1:i + 1 + WINDOW])
+    return pairs
+
+
+def _birthday_similarity(a: Tuple, b: Tuple) -> float:
+    # Compares birthday_parts()
+    if a == b:
+        return 1.0
+    if len(a) != 3 or len(b) != 3:
+        return 0.0
+    if a[2] == b[2] and a[0] == b[1] and a[1] == b[0]:
+        # Day and month swapped
+        return 0.7
+    return 0.5 if sum(x == y for x, y in zip(a, b)) == 2 else 0.0
+
+
+def score_pair(first: Employee, second: Employee) -> Tuple[float, List[str]]:
+    """
+    Scores two records from 0 to 1, with the reasons behind the score.
+    """
+    same_id = first.emp_id != second.emp_id and normalize_id(first.emp_id) == normalize_id(second.emp_id)
+    return _score(first, second, fold_text(first.name), fold_text(second.name),
+                  birthday_parts(first.birthday), birthday_parts(second.birthday), same_id, 0.0)
+
+
+def _score(first: Employee, second: Employee, first_name: str, second_name: str, first_date: Tuple,
+           second_date: Tuple, same_id: bool, threshold: float) -> Optional[Tuple[float, List[str]]]:
+    # Returns None as soon as the score cannot reach threshold
+    birthday = _birthday_similarity(first_date, second_date)
+    salary = 1.0 if first.salary_rate == second.salary_rate else 0.0
+    rest = BIRTHDAY_WEIGHT * birthday + SALARY_WEIGHT * salary + (ID_BONUS if same_id else 0.0)
+    if first_name == second_name:
+        name = 1.0
+    else:
+        # The name term must make up the rest; the cheap upper bounds of
+        # the match ratio rule most pairs out before the full comparison
+        needed = (threshold - rest) / NAME_WEIGHT
+        matcher = SequenceMatcher(None, first_name, second_name)
+        if matcher.real_quick_ratio() < needed or matcher.quick_ratio() < needed:
+            return None
+        name = matcher.ratio()
+    score = min(1.0, NAME_WEIGHT * name + rest)
+    if score < threshold:
+        return None
+    reasons = []
+    if name == 1.0:
+        reasons.append("same name" if first.name == second.name else "same name apart from accents or case")
+    elif name >= 0.8:
+        reasons.append("similar name")
+    if birthday == 1.0:
+        reasons.append("same birthday")
+    elif birthday:
+        reasons.append("similar birthday")
+    if salary:
+        reasons.append("same salary rate")
+    if same_id:
+        reasons.append("same ID apart from formatting")
+    return score, reasons
+
+
+def find_duplicates(employees: Iterable[Employee], threshold: float = DEFAULT_THRESHOLD) -> DuplicateReport:
+    """
+    Finds likely duplicate records: pairs sharing a blocking key (folded
+    name with most of the birthday, family and given name with the
+    birthday, or normalized ID) are scored, and those at or above
+    threshold are reported, best first.
+    """
+    employees = list(employees)
+    # The blocking pass allocates millions of small objects that would
+    # otherwise set off repeated full collections that find nothing to free
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        folded = [fold_text(emp.name) for emp in employees]
+        ids = [normalize_id(emp.emp_id) for emp in employees]
+        # Rosters repeat birthdays, so each distinct one is read once
+        parts = {birthday: birthday_parts(birthday) for birthday in {emp.birthday for emp in employees}}
+        dates = [parts[emp.birthday] for emp in employees]
+        candidates = candidate_pairs(employees, folded, ids, dates)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    report = DuplicateReport(records=len(employees), candidates=len(candidates), threshold=threshold)
+    for a, b in candidates:
+        first, second = employees[a], employees[b]
+        same_id = ids[a] == ids[b] and first.emp_id != second.emp_id
+        scored = _score(first, second, folded[a], folded[b], dates[a], dates[b], same_id, threshold)
+        if scored is not None:
+            report.pairs.append(DuplicatePair(employees[a], employees[b], *scored))
+    report.pairs.sort(key=lambda pair: (-pair.score, pair.first.emp_id, pair.second.emp_id))
+    return report
@@ -0,0 +1,164 @@
+# File: indexes.py
+
+from bisect import bisect_left, bisect_right, insort
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Set, Tuple
+import datetime
+
+from models import ChangeEvent, Employee
+from validation import parse_birthday
+
+# Sorts after every emp_id, closing a key range on the right
+_ID_MAX = "\U0010ffff"
+
+
+class SortedIndex:
+    """
+    (key, emp_id) pairs kept in key order. A range query bisects to both
+    ends and slices, so it costs O(log n + k) for k matches; insertion and
+    removal bisect too, plus a memmove of the tail.
+    """
+
+    def __init__(self, pairs: Iterable[Tuple[object, str]] = ()):
+        self._entries: List[Tuple[object, str]] = sorted(pairs)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, key, emp_id: str):
+        insort(self._entries, (key, emp_id))
+
+    def remove(self, key, emp_id: str):
+        position = bisect_left(self._entries, (key, emp_id))
+        if position < len(self._entries) and self._entries[position] == (key, emp_id):
+            del self._entries[position]
+
+    def range(self, low=None, high=None) -> List[str]:
+        """
+        IDs with low <= key <= high in key order; either bound may be None.
+        """
+        start = 0 if low is None else bisect_left(self._entries, (low, ""))
+        end = len(self._entries) if high is None else bisect_right(self._entries, (high, _ID_MAX))
+        return [emp_id for _, emp_id in self._entries[start:end]]
+
+
+def month_day(date: datetime.date) -> int:
+    return date.month * 100 + date.day
+
+
+def _birthday_window(days: int, today: datetime.date) -> Tuple[int, int]:
+    """
+    First and last month_day of the coming days; start > end when the
+    window wraps past the end of the year.
+    """
+    if days >= 365:
+        # The whole year, starting from today
+        return month_day(today), month_day(today) - 1
+    return month_day(today), month_day(today + datetime.timedelta(days=days))
+
+
+@dataclass(frozen=True)
+class RangeFilter:
+    """
+    Salary bounds (inclusive) and a birthday window in days from today;
+    None leaves that criterion out.
+    """
+    min_salary: Optional[float] = None
+    max_salary: Optional[float] = None
+    birthday_within_days: Optional[int] = None
+
+    def is_empty(self) -> bool:
+        return self.min_salary is None and self.max_salary is None and self.birthday_within_days is None
+
+
+class RosterIndexes:
+    """
+    Secondary indexes over a roster: salary, birth date ordinal and birth
+    month/day (for anniversaries). Built in bulk, then kept current by its
+    owner feeding it Department change events. Birthdays that cannot be
+    parsed are left out of the birthday indexes.
+    """
+
+    def __init__(self, employees: Iterable[Employee] = ()):
+        self.rebuild(employees)
+
+    def rebuild(self, employees: Iterable[Employee]):
+        salary_pairs = []
+        date_pairs = []
+        month_day_pairs = []
+        for emp in employees:
+            salary_pairs.append((emp.salary_rate, emp.emp_id))
+            birthday = parse_birthday(emp.birthday)
+            if birthday is not None:
+                date_pairs.append((birthday.toordinal(), emp.emp_id))
+                month_day_pairs.append((month_day(birthday), emp.emp_id))
+        self.salaries = SortedIndex(salary_pairs)
+        self.birth_dates = SortedIndex(date_pairs)
+        self.birth_month_days = SortedIndex(month_day_pairs)
+
+    def add(self, emp: Employee):
+        self.salaries.add(emp.salary_rate, emp.emp_id)
+        birthday = parse_birthday(emp.birthday)
+        if birthday is not None:
+            self.birth_dates.add(birthday.toordinal(), emp.emp_id)
+            self.birth_month_days.add(month_day(birthday), emp.emp_id)
+
+    def remove(self, emp: Employee):
+        self.salaries.remove(emp.salary_rate, emp.emp_id)
+        birthday = parse_birthday(emp.birthday)
+        if birthday is not None:
+            self.birth_dates.remove(birthday.toordinal(), emp.emp_id)
+            self.birth_month_days.remove(month_day(birthday), emp.emp_id)
+
+    def apply_change(self, event: ChangeEvent):
+        """
+        Applies a single-row change; after a RESET the owner rebuilds.
+        """
+        if event.old is not None:
+            self.remove(event.old)
+        if event.new is not None:
+            self.add(event.new)
+
+    def salary_between(self, low: Optional[float] = None, high: Optional[float] = None) -> List[str]:
+        return self.salaries.range(low, high)
+
+    def born_between(self, start: Optional[datetime.date] = None,
+                     end: Optional[datetime.date] = None) -> List[str]:
+        return self.birth_dates.range(start and start.toordinal(), end and end.toordinal())
+
+    def birthdays_within(self, days: int, today: Optional[datetime.date] = None) -> List[str]:
+        """
+        IDs whose next birthday falls within the coming days (today
+        included), soonest first.
+        """
+        start, end = _birthday_window(days, today or datetime.date.today())
+        if start <= end:
+            return self.birth_month_days.range(start, end)
+        # The window wraps past New Year's Eve
+        return self.birth_month_days.range(start, 1231) + self.birth_month_days.range(101, end)
+
+    def query(self, criteria: RangeFilter, today: Optional[datetime.date] = None) -> Set[str]:
+        results = None
+        if criteria.min_salary is not None or criteria.max_salary is not None:
+            results = set(self.salary_between(criteria.min_salary, criteria.max_salary))
+        if criteria.birthday_within_days is not None:
+            upcoming = set(self.birthdays_within(criteria.birthday_within_days, today))
+            results = upcoming if results is None else results & upcoming
+        return results if results is not None else set(self.salaries.range())
+
+    @staticmethod
+    def matches(criteria: RangeFilter, emp: Employee, today: Optional[datetime.date] = None) -> bool:
+        if criteria.min_salary is not None and emp.salary_rate < criteria.min_salary:
+            return False
+        if criteria.max_salary is not None and emp.salary_rate > criteria.max_salary:
+            return False
+        if criteria.birthday_within_days is not None:
+            birthday = parse_birthday(emp.birthday)
+            if birthday is None:
+                return False
+            start, end = _birthday_window(criteria.birthday_within_days, today or datetime.date.today())
+            key = month_day(birthday)
+            if start <= end:
+                return start <= key <= end
+            return key >= start or key <= end
+        return True
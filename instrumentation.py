@@ -0,0 +1,166 @@
+# File: instrumentation.py
+
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, Optional
+import datetime
+import functools
+import json
+import logging
+import os
+import threading
+import time
+
+# Upper bounds, in seconds, of the latency histogram buckets
+BUCKET_BOUNDS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.minimum = float("inf")
+        self.maximum = 0.0
+        # One slot per bound plus an overflow slot
+        self.buckets = [0] * (len(BUCKET_BOUNDS) + 1)
+
+    def record(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.minimum = min(self.minimum, seconds)
+        self.maximum = max(self.maximum, seconds)
+        self.buckets[bisect_left(BUCKET_BOUNDS, seconds)] += 1
+
+    def percentile(self, p: float) -> float:
+        """
+        Upper bound of the bucket holding the p-th percentile (0-100).
+        """
+        rank = self.count * p / 100
+        seen = 0
+        for bound, count in zip(BUCKET_BOUNDS, self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.maximum)
+        return self.maximum
+
+    def to_dict(self) -> dict:
+        labels = [f"<={bound}s" for bound in BUCKET_BOUNDS] + [f">{BUCKET_BOUNDS[-1]}s"]
+        return {
+            'count': self.count,
+            'total_s': self.total,
+            'mean_s': self.total / self.count if self.count else 0.0,
+            'min_s': self.minimum if self.count else 0.0,
+            'max_s': self.maximum,
+            'p50_s': self.percentile(50),
+            'p90_s': self.percentile(90),
+            'p99_s': self.percentile(99),
+            'buckets': {label: count for label, count in zip(labels, self.buckets) if count},
+        }
+
+
+class Metrics:
+    """
+    Process-wide registry of operation latencies and counters. Recording
+    only happens while enabled; the timing wrappers check a single flag
+    otherwise. Set EMS_METRICS=1 to enable it from startup.
+    """
+
+    def __init__(self):
+        self.enabled = bool(os.environ.get("EMS_METRICS"))
+        self.profile_dir = "profiles"
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, LatencyHistogram] = {}
+        self._counters: Counter = Counter()
+        self._profile_prefix: Optional[str] = None
+
+    @property
+    def active(self) -> bool:
+        return self.enabled or self._profile_prefix is not None
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            histogram = self._latencies.get(name)
+            if histogram is None:
+                histogram = self._latencies[name] = LatencyHistogram()
+            histogram.record(seconds)
+
+    def increment(self, name: str, amount: int = 1):
+        if self.enabled:
+            with self._lock:
+                self._counters[name] += amount
+
+    def profile_next(self, prefix: str = ""):
+        """
+        Runs the next timed operation whose name starts with prefix under
+        cProfile and writes its stats to profile_dir.
+        """
+        self._profile_prefix = prefix
+
+    def _take_profile_request(self, name: str) -> bool:
+        with self._lock:
+            if self._profile_prefix is None or not name.startswith(self._profile_prefix):
+                return False
+            self._profile_prefix = None
+            return True
+
+    def _profile(self, name: str, func, args, kwargs):
+        import cProfile
+
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(func, *args, **kwargs)
+        finally:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+            path = os.path.join(self.profile_dir, f"{name}-{stamp}.prof")
+            profiler.dump_stats(path)
+            logging.info("Saved profile of %s to %s", name, path, extra={'operation': 'profile'})
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                'latency': {name: hist.to_dict() for name, hist in sorted(self._latencies.items())},
+                'counters': dict(sorted(self._counters.items())),
+            }
+
+    def dump(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+    def reset(self):
+        with self._lock:
+            self._latencies.clear()
+            self._counters.clear()
+
+
+metrics = Metrics()
+
+
+def timed(name: str):
+    """
+    Decorator counting every call under name.calls and recording its
+    latency under name.
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not metrics.active:
+                return func(*args, **kwargs)
+            metrics.increment(f"{name}.calls")
+            if metrics._take_profile_request(name):
+                return metrics._profile(name, func, args, kwargs)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                metrics.increment(f"{name}.errors")
+                raise
+            finally:
+                if metrics.enabled:
+                    metrics.record(name, time.perf_counter() - started)
+        return wrapper
+    return decorate
+
@@ -0,0 +1,88 @@
+# File: journal.py
+
+import json
+import os
+from typing import Iterator, List, Tuple
+
+
+class ChangeJournal:
+    """
+    Append-only log of roster mutations, stored as one compact JSON
+    record per line next to the department's data file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entry_count = 0
+        self._file = None
+
+    @property
+    def size(self) -> int:
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def append(self, entry: dict):
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write(json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.entry_count += 1
+
+    def replay(self) -> Iterator[dict]:
+        """
+        Yields the logged entries in order. A torn final line left behind
+        by a crash mid-append is dropped from the file.
+        """
+        self.entry_count = 0
+        if not os.path.exists(self.path):
+            return
+        valid_bytes = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                valid_bytes += len(line)
+                self.entry_count += 1
+                yield entry
+        if valid_bytes < self.size:
+            self.close()
+            with open(self.path, 'r+b') as f:
+                f.truncate(valid_bytes)
+
+    def read_from(self, offset: int) -> Tuple[List[dict], int]:
+        """
+        Returns the complete entries written after byte offset, e.g. by
+        another process sharing the journal, and the offset they end at.
+        """
+        entries = []
+        if not os.path.exists(self.path):
+            return entries, offset
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    break
+                offset += len(line)
+        return entries, offset
+
+    def clear(self):
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.entry_count = 0
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
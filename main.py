@@ -1,32 +1,78 @@
 # File: main.py
 
-import sys
 import logging
+import sys
+import threading
+from PyQt6.QtCore import QObject, pyqtSignal
 from PyQt6.QtWidgets import QApplication
+from app_logging import setup_logging, shutdown_logging
+from instrumentation import metrics
 from models import Department
+from organization import Organization, open_organization
+from persistence import PersistenceWorker
 from views import EmployeeView
 from controllers import EmployeeController
 
 
-def setup_logging():
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler("app.log"),
-            logging.StreamHandler(sys.stdout)
-        ]
-    )
+class SessionLoader(QObject):
+    """
+    Opens the departments on a background thread, so the window is shown
+    and stays responsive while a large roster loads, then hands them to
+    the GUI thread through loaded.
+    """
+    loaded = pyqtSignal(object, object)
+    failed = pyqtSignal(str)
+
+    def start(self, persistence_worker: PersistenceWorker):
+        threading.Thread(target=self._run, args=(persistence_worker,), name="session-loader",
+                         daemon=True).start()
+
+    def _run(self, persistence_worker: PersistenceWorker):
+        try:
+            organization = open_organization(persistence_worker=persistence_worker)
+            names = organization.department_names()
+            department = organization.get_department("HR" if "HR" in names else names[0])
+        except Exception as e:
+            logging.error("Error loading employees: %s", e, extra={'operation': 'load'})
+            self.failed.emit(str(e))
+            return
+        self.loaded.emit(organization, department)
 
 
 def main():
-    setup_logging()
-    app = QApplication(sys.argv)
-    department = Department("HR")
-    view = EmployeeView()
-    controller = EmployeeController(department, view)
-    view.show()
-    sys.exit(app.exec())
+    log_listener = setup_logging()
+    try:
+        app = QApplication(sys.argv)
+        persistence_worker = PersistenceWorker()
+        view = EmployeeView()
+        view.show()
+        view.show_loading(True)
+        session = []
+
+        def on_loaded(organization: Organization, department: Department):
+            session.append(organization)
+            session.append(EmployeeController(department, view, organization, persistence_worker))
+            view.show_loading(False)
+
+        def on_failed(message: str):
+            view.show_loading(False)
+            view.show_error(f"Failed to load employees: {message}")
+
+        loader = SessionLoader()
+        loader.loaded.connect(on_loaded)
+        loader.failed.connect(on_failed)
+        loader.start(persistence_worker)
+        exit_code = app.exec()
+        # Write out anything still queued before the process ends
+        if session:
+            session[0].close()
+        persistence_worker.stop()
+        if metrics.enabled:
+            metrics.dump("metrics.json")
+    finally:
+        # Runs even if startup fails so queued records reach app.log
+        shutdown_logging(log_listener)
+    sys.exit(exit_code)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,50 @@
+# File: memo.py
+
+from typing import Callable, Dict
+
+from models import ChangeEvent, Department, Employee
+
+
+class EmployeeMemo:
+    """
+    Caches compute(employee) by emp_id for one Department. Change events
+    drop only the entries of the records they touch; a reset drops all.
+    Row events are used rather than batches so entries are dropped even
+    inside an open transaction.
+    """
+
+    def __init__(self, department: Department, compute: Callable[[Employee], object]):
+        self.department = department
+        self.compute = compute
+        self._values: Dict[str, object] = {}
+        department.subscribe(self.apply_change)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def get(self, emp_id: str):
+        """
+        Returns the cached value for emp_id, computing it on a miss. Raises
+        ValueError if the employee does not exist.
+        """
+        try:
+            return self._values[emp_id]
+        except KeyError:
+            pass
+        value = self._values[emp_id] = self.compute(self.department.get_employee(emp_id))
+        return value
+
+    def apply_change(self, event: ChangeEvent):
+        if event.kind == ChangeEvent.RESET:
+            self._values.clear()
+            return
+        self._values.pop(event.emp_id, None)
+        if event.new is not None:
+            self._values.pop(event.new.emp_id, None)
+
+    def clear(self):
+        self._values.clear()
+
+    def detach(self):
+        self.department.unsubscribe(self.apply_change)
+        self._values.clear()
@@ -1,13 +1,29 @@
 # File: models.py
 
+from bisect import bisect_left, bisect_right, insort
+from contextlib import contextmanager
 from dataclasses import dataclass, field
-from typing import List
-import json
-import os
+from itertools import islice
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+import threading
+
+from instrumentation import timed
+from storage import EmployeeStore, create_store
+
+# External changes touching more records than this are applied as a reset
+MAX_ROW_MERGE = 1000
+# Rows per page of Department.page() unless the caller asks otherwise
+PAGE_SIZE = 200
+# page() walks a matching set itself, rather than the whole roster, when
+# the roster has more than this many times as many IDs
+SPARSE_MATCH = 8
 
 
 @dataclass
 class Employee:
+    # No per-instance __dict__: large rosters hold one of these per employee
+    __slots__ = ("emp_id", "name", "birthday", "salary_rate")
+
     emp_id: str
     name: str
     birthday: str
@@ -16,56 +32,491 @@ class Employee:
     def get_annual_salary(self) -> float:
         return self.salary_rate * 12
 
+    def to_dict(self) -> dict:
+        return {
+            'emp_id': self.emp_id,
+            'name': self.name,
+            'birthday': self.birthday,
+            'salary_rate': self.salary_rate,
+        }
+
+
+@dataclass(frozen=True)
+class ChangeEvent:
+    """
+    Describes one change to a Department's roster. For "updated", emp_id is
+    the ID the record was stored under before the change. "reset" means the
+    whole roster was replaced and carries no record.
+    """
+    INSERTED = "inserted"
+    UPDATED = "updated"
+    REMOVED = "removed"
+    RESET = "reset"
+
+    kind: str
+    emp_id: Optional[str] = None
+    old: Optional[Employee] = None
+    new: Optional[Employee] = None
+
+
+@dataclass(frozen=True)
+class ChangeBatch:
+    """
+    The change events of one Department operation, in order: a single
+    add, update or remove, add_employees(), a transaction() or a refresh().
+    """
+    events: Tuple[ChangeEvent, ...]
+
+    def __iter__(self) -> Iterator[ChangeEvent]:
+        return iter(self.events)
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    @property
+    def is_reset(self) -> bool:
+        return any(event.kind == ChangeEvent.RESET for event in self.events)
+
+    def affected_ids(self) -> Set[str]:
+        """
+        IDs a record was stored under before or after the batch.
+        """
+        ids = set()
+        for event in self.events:
+            if event.emp_id is not None:
+                ids.add(event.emp_id)
+            if event.new is not None:
+                ids.add(event.new.emp_id)
+        return ids
+
+
+@dataclass
+class EmployeePage:
+    """
+    One page of a Department in emp_id order. next_cursor is passed back
+    to page() for the following page and is None after the last one.
+    """
+    employees: List[Employee]
+    next_cursor: Optional[str]
+    # Rows in the whole listing; with a matching filter, the number of
+    # IDs in it, which may include some no longer on the roster
+    total: int
+
 
 @dataclass
 class Department:
     name: str
     employees: List[Employee] = field(default_factory=list)
     data_file: str = "employees.json"
+    # When enabled, edits are appended to a change journal next to data_file
+    # and folded into a fresh snapshot once the journal passes a threshold.
+    journaled: bool = False
+    # Backend the roster is persisted to; built from data_file when omitted
+    storage: Optional[EmployeeStore] = None
+    # Keep the roster in a column-oriented columnar.EmployeeTable
+    columnar: bool = False
+    # emp_id -> position in self.employees, kept in sync by every mutation
+    _index: Dict[str, int] = field(default_factory=dict, init=False, repr=False)
+    # Sorted emp_ids backing page(), built on first use and then kept in
+    # sync by single-row mutations; None until needed again after a bulk one
+    _sorted_ids: Optional[List[str]] = field(default=None, init=False, repr=False)
+    # Journal entries held back by an open transaction(), None outside one
+    _pending: Optional[List[dict]] = field(default=None, init=False, repr=False)
+    # How to reverse each row mutation made inside an open transaction(),
+    # replayed backwards on rollback; None outside one
+    _undo: Optional[List[tuple]] = field(default=None, init=False, repr=False)
+    _listeners: List[Callable[[ChangeEvent], None]] = field(default_factory=list, init=False, repr=False)
+    _batch_listeners: List[Callable[[ChangeBatch], None]] = field(default_factory=list, init=False, repr=False)
+    # Events of the operation in progress, None when not batching
+    _batch: Optional[List[ChangeEvent]] = field(default=None, init=False, repr=False)
+    # Held while the roster is mid-change, so a background writer never
+    # copies it half-updated or with a transaction still open
+    _lock: threading.RLock = field(default_factory=threading.RLock, init=False, repr=False)
 
     def __post_init__(self):
+        if self.storage is None:
+            self.storage = create_store(self.data_file, journaled=self.journaled)
+        self.storage.set_roster_lock(self._lock)
+        self.employees = self._container(self.employees)
+        self._rebuild_index()
         self.load_employees()
 
+    def _container(self, employees):
+        if not self.columnar:
+            return employees
+        # columnar imports this module, so it is only loaded when needed
+        from columnar import EmployeeTable
+
+        return employees if isinstance(employees, EmployeeTable) else EmployeeTable(employees)
+
+    def _rebuild_index(self):
+        if self.columnar:
+            emp_ids = self.employees.emp_ids
+        else:
+            emp_ids = [emp.emp_id for emp in self.employees]
+        self._index = {emp_id: position for position, emp_id in enumerate(emp_ids)}
+        self._sorted_ids = None
+
+    def subscribe(self, listener: Callable, batched: bool = False):
+        """
+        Registers listener for ChangeEvents as each row changes or, when
+        batched, for one ChangeBatch once each operation is complete.
+        """
+        (self._batch_listeners if batched else self._listeners).append(listener)
+
+    def unsubscribe(self, listener: Callable, batched: bool = False):
+        (self._batch_listeners if batched else self._listeners).remove(listener)
+
+    def _notify(self, event: ChangeEvent):
+        for listener in list(self._listeners):
+            listener(event)
+        if self._batch is not None:
+            self._batch.append(event)
+        elif self._batch_listeners:
+            self._deliver(ChangeBatch((event,)))
+
+    def _deliver(self, batch: ChangeBatch):
+        for listener in list(self._batch_listeners):
+            listener(batch)
+
+    @contextmanager
+    def _batched(self):
+        # Collects the events of the outermost block into one ChangeBatch
+        if self._batch is not None:
+            yield
+            return
+        self._batch = []
+        try:
+            yield
+        finally:
+            events, self._batch = self._batch, None
+            if events and self._batch_listeners:
+                self._deliver(ChangeBatch(tuple(events)))
+
+    def has_employee(self, emp_id: str) -> bool:
+        return emp_id in self._index
+
+    def get_employee(self, emp_id: str) -> Employee:
+        position = self._index.get(emp_id)
+        if position is None:
+            raise ValueError("Employee ID not found.")
+        return self.employees[position]
+
     def add_employee(self, employee: Employee):
-        if any(emp.emp_id == employee.emp_id for emp in self.employees):
+        if employee.emp_id in self._index:
             raise ValueError("Employee ID already exists.")
-        self.employees.append(employee)
-        self.save_employees()
+        self._insert(employee)
+        try:
+            self._persist({'op': 'add', 'emp': employee.to_dict()})
+        finally:
+            self._notify(ChangeEvent(ChangeEvent.INSERTED, employee.emp_id, new=employee))
+
+    def add_employees(self, employees: List[Employee]):
+        """
+        Adds several employees with a single persistence commit. Nothing is
+        added if any ID is already taken or repeated.
+        """
+        seen = set()
+        for employee in employees:
+            if employee.emp_id in self._index or employee.emp_id in seen:
+                raise ValueError(f"Employee ID already exists: {employee.emp_id}")
+            seen.add(employee.emp_id)
+        with self._lock:
+            if len(employees) > MAX_ROW_MERGE:
+                # One sort on the next page() beats this many insertions
+                self._sorted_ids = None
+            for employee in employees:
+                self._insert(employee)
+        try:
+            self._persist({'op': 'batch', 'entries': [{'op': 'add', 'emp': emp.to_dict()} for emp in employees]})
+        finally:
+            if self._listeners or self._batch_listeners:
+                with self._batched():
+                    for employee in employees:
+                        self._notify(ChangeEvent(ChangeEvent.INSERTED, employee.emp_id, new=employee))
 
     def remove_employee(self, emp_id: str):
-        original_count = len(self.employees)
-        self.employees = [emp for emp in self.employees if emp.emp_id != emp_id]
-        if len(self.employees) == original_count:
+        if emp_id not in self._index:
             raise ValueError("Employee ID not found.")
-        self.save_employees()
+        old = self.employees[self._index[emp_id]]
+        self._delete(emp_id)
+        try:
+            self._persist({'op': 'remove', 'id': emp_id})
+        finally:
+            self._notify(ChangeEvent(ChangeEvent.REMOVED, emp_id, old=old))
 
-    def update_employee(self, updated_employee: Employee):
-        for index, emp in enumerate(self.employees):
-            if emp.emp_id == updated_employee.emp_id:
-                self.employees[index] = updated_employee
-                self.save_employees()
-                return
-        raise ValueError("Employee ID not found.")
+    def update_employee(self, updated_employee: Employee, emp_id: Optional[str] = None):
+        """
+        Replaces the record stored under emp_id (defaults to the updated
+        employee's own ID), which allows an employee's ID to be changed.
+        """
+        current_id = updated_employee.emp_id if emp_id is None else emp_id
+        if current_id not in self._index:
+            raise ValueError("Employee ID not found.")
+        if updated_employee.emp_id != current_id and updated_employee.emp_id in self._index:
+            raise ValueError("Employee ID already exists.")
+        old = self.employees[self._index[current_id]]
+        self._replace(current_id, updated_employee)
+        try:
+            self._persist({'op': 'update', 'id': current_id, 'emp': updated_employee.to_dict()})
+        finally:
+            self._notify(ChangeEvent(ChangeEvent.UPDATED, current_id, old=old, new=updated_employee))
 
     def list_employees(self) -> List[Employee]:
         return self.employees
 
+    def page(self, after: Optional[str] = None, limit: int = PAGE_SIZE,
+             matching: Optional[Set[str]] = None) -> EmployeePage:
+        """
+        Returns up to limit employees in emp_id order, starting after the
+        cursor (an emp_id) or from the beginning when it is None. Cursors
+        stay valid across edits, since rows added or removed elsewhere do
+        not shift them. matching, if given, limits the pages to those IDs.
+        """
+        index = self._index
+        if matching is not None and len(matching) * SPARSE_MATCH < len(index):
+            # A narrow filter: walk its own sorted IDs rather than the
+            # roster's, skipping any no longer on it
+            ids = sorted(matching)
+            start = 0 if after is None else bisect_right(ids, after)
+            page_ids = list(islice(filter(index.__contains__, islice(ids, start, None)), limit))
+            more = len(page_ids) == limit
+            total = len(matching)
+        else:
+            if self._sorted_ids is None:
+                self._sorted_ids = sorted(index)
+            ids = self._sorted_ids
+            start = 0 if after is None else bisect_right(ids, after)
+            if matching is None:
+                page_ids = ids[start:start + limit]
+                more = start + limit < len(ids)
+                total = len(ids)
+            else:
+                page_ids = list(islice(filter(matching.__contains__, islice(ids, start, None)), limit))
+                # A full page may be the last one; the next call then comes
+                # back empty
+                more = len(page_ids) == limit
+                total = len(matching)
+        employees = self.employees
+        return EmployeePage([employees[index[emp_id]] for emp_id in page_ids],
+                            page_ids[-1] if more and page_ids else None, total)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Groups several add/update/remove calls into a single commit. Nothing
+        is persisted until the outermost block exits; if an exception
+        escapes, the in-memory roster is restored to its state on entry.
+        Batched listeners get the whole block as one ChangeBatch.
+        """
+        outermost = self._pending is None
+        if outermost:
+            self._pending = []
+            self._undo = []
+        saved_pending = len(self._pending)
+        saved_undo = len(self._undo)
+        # Held for the whole block so a background writer never copies a
+        # roster with uncommitted changes
+        with self._lock, self._batched():
+            try:
+                yield self
+            except BaseException:
+                self._roll_back(saved_undo)
+                del self._pending[saved_pending:]
+                if outermost:
+                    self._pending = None
+                    self._undo = None
+                self._notify(ChangeEvent(ChangeEvent.RESET))
+                raise
+            if outermost:
+                entries, self._pending = self._pending, None
+                self._undo = None
+                if entries:
+                    self._persist({'op': 'batch', 'entries': entries})
+
+    def _roll_back(self, saved_undo: int):
+        # Reverses the row mutations logged since saved_undo, newest first,
+        # which restores every record to its original position
+        undo = self._undo
+        index, employees = self._index, self.employees
+        while len(undo) > saved_undo:
+            step = undo.pop()
+            if step[0] == 'insert':
+                del index[employees.pop().emp_id]
+            elif step[0] == 'delete':
+                _, employee, position = step
+                if position < len(employees):
+                    moved = employees[position]
+                    index[moved.emp_id] = len(employees)
+                    employees.append(moved)
+                    employees[position] = employee
+                else:
+                    employees.append(employee)
+                index[employee.emp_id] = position
+            else:
+                _, old, position = step
+                del index[employees[position].emp_id]
+                index[old.emp_id] = position
+                employees[position] = old
+        self._sorted_ids = None
+
+    # In-memory mutations behind the public API
+
+    def _insert(self, employee: Employee):
+        with self._lock:
+            self._index[employee.emp_id] = len(self.employees)
+            self.employees.append(employee)
+        if self._undo is not None:
+            self._undo.append(('insert',))
+        if self._sorted_ids is not None:
+            insort(self._sorted_ids, employee.emp_id)
+
+    def _unsort(self, emp_id: str):
+        if self._sorted_ids is not None:
+            del self._sorted_ids[bisect_left(self._sorted_ids, emp_id)]
+
+    def _delete(self, emp_id: str):
+        self._unsort(emp_id)
+        with self._lock:
+            position = self._index.pop(emp_id)
+            if self._undo is not None:
+                self._undo.append(('delete', self.employees[position], position))
+            # Move the last record into the freed slot so removal stays O(1)
+            last = self.employees.pop()
+            if position < len(self.employees):
+                self.employees[position] = last
+                self._index[last.emp_id] = position
+
+    def _replace(self, emp_id: str, employee: Employee):
+        position = self._index[emp_id]
+        if self._undo is not None:
+            self._undo.append(('replace', self.employees[position], position))
+        if employee.emp_id != emp_id:
+            del self._index[emp_id]
+            self._index[employee.emp_id] = position
+            self._unsort(emp_id)
+            if self._sorted_ids is not None:
+                insort(self._sorted_ids, employee.emp_id)
+        with self._lock:
+            self.employees[position] = employee
+
+    @timed("storage.persist")
+    def _persist(self, entry: dict):
+        if self._pending is not None:
+            self._pending.append(entry)
+            return
+        try:
+            self.storage.apply(entry, self.employees)
+        except Exception as e:
+            raise IOError(f"Failed to save employees: {e}")
+
+    def compact(self):
+        """
+        Folds any change journal kept by the storage backend into a fresh
+        snapshot.
+        """
+        try:
+            self.storage.compact(self.employees)
+        except Exception as e:
+            raise IOError(f"Failed to save employees: {e}")
+
+    @timed("storage.save")
     def save_employees(self):
         try:
-            with open(self.data_file, 'w') as f:
-                json.dump([emp.__dict__ for emp in self.employees], f, indent=4)
+            self.storage.save(self.employees)
         except Exception as e:
             raise IOError(f"Failed to save employees: {e}")
 
+    @timed("storage.load")
     def load_employees(self):
-        if not os.path.exists(self.data_file):
-            return
         try:
-            with open(self.data_file, 'r') as f:
-                employees_data = json.load(f)
-                self.employees = [Employee(**emp) for emp in employees_data]
+            employees = self.storage.load()
         except Exception as e:
             raise IOError(f"Failed to load employees: {e}")
+        if employees is not None:
+            self.employees = self._container(employees)
+            self._rebuild_index()
+            self._notify(ChangeEvent(ChangeEvent.RESET))
+
+    def refresh(self) -> int:
+        """
+        Merges changes other processes made to the stored roster into this
+        department, notifying listeners row by row. Reads only the new
+        journal entries when the backend can tell them apart, the whole
+        roster otherwise. Returns the number of records that changed.
+        """
+        if self._pending is not None:
+            return 0
+        try:
+            entries = self.storage.external_changes()
+            employees = self.storage.load() if entries is None else None
+        except Exception as e:
+            raise IOError(f"Failed to load employees: {e}")
+        with self._batched():
+            if entries is None:
+                return self._merge_roster(employees or [])
+            return sum(self._merge_entry(entry) for entry in entries)
+
+    # Merging external changes; nothing here is persisted again
+
+    def _merge_entry(self, entry: dict) -> int:
+        # Entries may already be reflected in memory, e.g. ones this
+        # process wrote itself, so each step is idempotent
+        op = entry['op']
+        if op == 'batch':
+            return sum(self._merge_entry(batched_entry) for batched_entry in entry['entries'])
+        if op == 'remove':
+            return self._merge_removal(entry['id'])
+        emp = entry['emp']
+        employee = Employee(emp['emp_id'], emp['name'], emp['birthday'], emp['salary_rate'])
+        if op == 'update' and entry['id'] != employee.emp_id and entry['id'] in self._index:
+            if employee.emp_id in self._index:
+                return self._merge_removal(entry['id']) + self._merge_record(employee)
+            old = self.employees[self._index[entry['id']]]
+            self._replace(entry['id'], employee)
+            self._notify(ChangeEvent(ChangeEvent.UPDATED, entry['id'], old=old, new=employee))
+            return 1
+        return self._merge_record(employee)
+
+    def _merge_record(self, employee: Employee) -> int:
+        position = self._index.get(employee.emp_id)
+        if position is None:
+            self._insert(employee)
+            self._notify(ChangeEvent(ChangeEvent.INSERTED, employee.emp_id, new=employee))
+            return 1
+        old = self.employees[position]
+        if old == employee:
+            return 0
+        self._replace(employee.emp_id, employee)
+        self._notify(ChangeEvent(ChangeEvent.UPDATED, employee.emp_id, old=old, new=employee))
+        return 1
+
+    def _merge_removal(self, emp_id: str) -> int:
+        position = self._index.get(emp_id)
+        if position is None:
+            return 0
+        old = self.employees[position]
+        self._delete(emp_id)
+        self._notify(ChangeEvent(ChangeEvent.REMOVED, emp_id, old=old))
+        return 1
+
+    def _merge_roster(self, employees: List[Employee]) -> int:
+        stored = {employee.emp_id: employee for employee in employees}
+        removed = [emp_id for emp_id in self._index if emp_id not in stored]
+        changed = [employee for employee in employees
+                   if employee.emp_id not in self._index or self.employees[self._index[employee.emp_id]] != employee]
+        if len(removed) + len(changed) > MAX_ROW_MERGE:
+            # Past this many rows one reset is cheaper for listeners than
+            # a stream of row events
+            self.employees = self._container(employees)
+            self._rebuild_index()
+            self._notify(ChangeEvent(ChangeEvent.RESET))
+            return len(removed) + len(changed)
+        for emp_id in removed:
+            self._merge_removal(emp_id)
+        for employee in changed:
+            self._merge_record(employee)
+        return len(removed) + len(changed)
 
     def __str__(self):
         return f"Department Name: {self.name}, Total Employees: {len(self.employees)}"
@@ -0,0 +1,111 @@
+# File: organization.py
+
+from collections import OrderedDict
+from typing import Iterable, List, Optional
+from urllib.parse import quote, unquote
+import os
+
+from models import Department, Employee
+from persistence import BackgroundStore, PersistenceWorker
+from storage import create_store
+
+
+class Organization:
+    """
+    Registry of departments, each persisted in its own shard file under
+    data_dir. Departments are loaded on first access and the least recently
+    used ones are dropped from memory once more than max_loaded are open.
+    With a persistence_worker, shards are written on its background thread.
+    """
+
+    def __init__(self, data_dir: str = "departments", max_loaded: int = 8,
+                 extension: str = ".json", journaled: bool = False,
+                 persistence_worker: Optional[PersistenceWorker] = None):
+        self.data_dir = data_dir
+        self.max_loaded = max_loaded
+        self.extension = extension
+        self.journaled = journaled
+        self.persistence_worker = persistence_worker
+        self._loaded: "OrderedDict[str, Department]" = OrderedDict()
+        os.makedirs(data_dir, exist_ok=True)
+
+    def shard_path(self, name: str) -> str:
+        # Percent-encoding keeps any department name a safe, reversible file name
+        return os.path.join(self.data_dir, quote(name, safe=" ") + self.extension)
+
+    def department_names(self) -> List[str]:
+        names = set(self._loaded)
+        for file_name in os.listdir(self.data_dir):
+            if file_name.endswith(self.extension):
+                names.add(unquote(file_name[:-len(self.extension)]))
+        return sorted(names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._loaded or os.path.exists(self.shard_path(name))
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._loaded
+
+    def get_department(self, name: str) -> Department:
+        department = self._loaded.get(name)
+        if department is not None:
+            self._loaded.move_to_end(name)
+            return department
+        if name not in self:
+            raise ValueError(f"Department '{name}' not found.")
+        return self._open(name)
+
+    def create_department(self, name: str, employees: Optional[Iterable[Employee]] = None) -> Department:
+        if not name:
+            raise ValueError("Department name is required.")
+        if name in self:
+            raise ValueError(f"Department '{name}' already exists.")
+        department = self._open(name)
+        department.add_employees(list(employees or ()))
+        # Write the shard even when empty so the department is listed
+        department.save_employees()
+        return department
+
+    def _open(self, name: str) -> Department:
+        data_file = self.shard_path(name)
+        storage = create_store(data_file, journaled=self.journaled)
+        if self.persistence_worker is not None:
+            storage = BackgroundStore(storage, self.persistence_worker)
+        department = Department(name, data_file=data_file, journaled=self.journaled, storage=storage)
+        self._loaded[name] = department
+        while len(self._loaded) > self.max_loaded:
+            self.evict(next(iter(self._loaded)))
+        return department
+
+    def evict(self, name: str):
+        """
+        Drops a loaded department from memory. Every change is already
+        persisted, so it is simply reloaded from its shard when next needed.
+        """
+        department = self._loaded.pop(name, None)
+        if department is not None:
+            department.storage.close()
+
+    def close(self):
+        for name in list(self._loaded):
+            self.evict(name)
+
+
+def open_organization(data_dir: str = "departments", default_name: str = "HR",
+                      persistence_worker: Optional[PersistenceWorker] = None) -> Organization:
+    organization = Organization(data_dir, persistence_worker=persistence_worker)
+    if not organization.department_names():
+        # First run with per-department shards: seed the default department
+        # from the single employees.json used before
+        legacy = Department(default_name)
+        organization.create_department(default_name, legacy.list_employees())
+        legacy.storage.close()
+    return organization
+
+
+def department_data_file(data_dir: str, name: str) -> str:
+    """
+    The shard the GUI keeps department name in, for tools that open a
+    single department's file directly.
+    """
+    return open_organization(data_dir).shard_path(name)
@@ -0,0 +1,156 @@
+# File: persistence.py
+
+from contextlib import nullcontext
+from typing import Callable, Dict, List, Optional
+import threading
+
+from instrumentation import timed
+from storage import EmployeeStore
+
+
+class _PendingWrite:
+    def __init__(self, store: EmployeeStore):
+        self.store = store
+        self.entries: List[dict] = []
+        # The caller's live roster and the lock its changes hold; copied by
+        # the writer only if it is read
+        self.roster = None
+        self.roster_lock = None
+        # "apply" writes the queued entries, "save"/"compact" the latest roster
+        self.mode = "apply"
+
+
+class PersistenceWorker:
+    """
+    Dedicated writer thread shared by every BackgroundStore. Writes queued
+    for the same store while a previous one is in progress are coalesced:
+    their entries go out as one batch, or a single snapshot of the latest
+    roster when a full save was requested. Failures are reported to the
+    error listeners from the writer thread.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._pending: Dict[int, _PendingWrite] = {}
+        self._failed = set()
+        self._busy = False
+        self._stopping = False
+        self._error_listeners: List[Callable[[Exception], None]] = []
+        self._thread = threading.Thread(target=self._run, name="persistence-worker", daemon=True)
+        self._thread.start()
+
+    def add_error_listener(self, listener: Callable[[Exception], None]):
+        self._error_listeners.append(listener)
+
+    def submit(self, store: EmployeeStore, employees, entry: Optional[dict] = None, mode: str = "apply",
+               roster_lock=None):
+        with self._condition:
+            if self._stopping:
+                raise IOError("Persistence worker has been stopped.")
+            pending = self._pending.get(id(store))
+            if pending is None:
+                pending = self._pending[id(store)] = _PendingWrite(store)
+            if entry is not None:
+                pending.entries.append(entry)
+            if id(store) in self._failed:
+                self._failed.discard(id(store))
+                mode = "save"
+            if mode != "apply":
+                pending.mode = mode
+            pending.roster = employees
+            pending.roster_lock = roster_lock
+            self._condition.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until every queued write has been attempted. Returns False if
+        the timeout expired first.
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._pending and not self._busy, timeout)
+
+    def stop(self, timeout: Optional[float] = None) -> bool:
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending or self._stopping)
+                if not self._pending:
+                    return
+                pending = self._pending.pop(next(iter(self._pending)))
+                self._busy = True
+            try:
+                self._write(pending)
+            except Exception as e:
+                with self._condition:
+                    # The failed entries never reached the store, so its next
+                    # write is a full snapshot instead
+                    self._failed.add(id(pending.store))
+                for listener in list(self._error_listeners):
+                    listener(e)
+            finally:
+                with self._condition:
+                    self._busy = False
+                    self._condition.notify_all()
+
+    @staticmethod
+    @timed("persistence.write")
+    def _write(pending: _PendingWrite):
+        employees = None
+        if pending.mode != "apply" or pending.store.needs_roster():
+            # One copy per coalesced write, taken here rather than on every
+            # submit. The caller's lock keeps out a half-done change or an
+            # open transaction
+            with pending.roster_lock or nullcontext():
+                employees = pending.roster.copy()
+        if pending.mode == "save":
+            pending.store.save(employees)
+        elif pending.mode == "compact":
+            pending.store.compact(employees)
+        elif pending.entries:
+            entry = pending.entries[0] if len(pending.entries) == 1 else {'op': 'batch', 'entries': pending.entries}
+            pending.store.apply(entry, employees)
+
+
+class BackgroundStore(EmployeeStore):
+    """
+    Wraps another store so that writes happen on a PersistenceWorker and
+    never block the caller. Reads and close() wait for queued writes first.
+    """
+
+    def __init__(self, store: EmployeeStore, worker: PersistenceWorker):
+        self.store = store
+        self.worker = worker
+        self.roster_lock = None
+
+    def set_roster_lock(self, lock):
+        self.roster_lock = lock
+
+    def load(self):
+        self.worker.flush()
+        return self.store.load()
+
+    def changed_externally(self) -> bool:
+        return self.store.changed_externally()
+
+    def external_changes(self):
+        self.worker.flush()
+        return self.store.external_changes()
+
+    def apply(self, entry: dict, employees):
+        self.worker.submit(self.store, employees, entry, roster_lock=self.roster_lock)
+
+    def save(self, employees):
+        self.worker.submit(self.store, employees, mode="save", roster_lock=self.roster_lock)
+
+    def compact(self, employees):
+        self.worker.submit(self.store, employees, mode="compact", roster_lock=self.roster_lock)
+
+    def close(self):
+        self.worker.flush()
+        self.store.close()
@@ -0,0 +1,102 @@
+# File: search.py
+
+from collections import defaultdict
+from typing import Dict, Iterable, Optional, Set
+import unicodedata
+
+# Strips combining diacritics (after NFD) and folds the Vietnamese đ
+_FOLD_TABLE = {code: None for code in range(0x0300, 0x0370)}
+_FOLD_TABLE.update({ord("đ"): "d", ord("Đ"): "d"})
+
+GRAM_SIZE = 3
+
+
+def fold_text(text: str) -> str:
+    """
+    Lower-cases text and removes accents, so "Nguyễn Đức" matches "nguyen duc".
+    """
+    return unicodedata.normalize("NFD", text).translate(_FOLD_TABLE).casefold()
+
+
+def _grams(text: str) -> Set[str]:
+    return {text[i:i + GRAM_SIZE] for i in range(len(text) - GRAM_SIZE + 1)}
+
+
+class SearchIndex:
+    """
+    Accent-insensitive substring search over employee IDs and names, backed
+    by a trigram index that is updated record by record.
+    """
+
+    def __init__(self, employees: Optional[Iterable] = None):
+        self._texts: Dict[str, str] = {}
+        self._postings: Dict[str, Set[str]] = defaultdict(set)
+        text_of = self._text_of
+        postings = self._postings
+        for emp in employees or ():
+            text = self._texts[emp.emp_id] = text_of(emp)
+            for i in range(len(text) - GRAM_SIZE + 1):
+                postings[text[i:i + GRAM_SIZE]].add(emp.emp_id)
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    @staticmethod
+    def _text_of(emp) -> str:
+        # The separator keeps a query from matching across ID and name
+        return fold_text(emp.emp_id) + "\0" + fold_text(emp.name)
+
+    def add(self, emp):
+        if emp.emp_id in self._texts:
+            self.remove(emp.emp_id)
+        text = self._text_of(emp)
+        self._texts[emp.emp_id] = text
+        for gram in _grams(text):
+            self._postings[gram].add(emp.emp_id)
+
+    def remove(self, emp_id: str):
+        text = self._texts.pop(emp_id, None)
+        if text is None:
+            return
+        for gram in _grams(text):
+            posting = self._postings[gram]
+            posting.discard(emp_id)
+            if not posting:
+                del self._postings[gram]
+
+    def apply_change(self, event):
+        """
+        Keeps the index in step with a Department ChangeEvent. A "reset"
+        carries no records; the owner rebuilds the index instead.
+        """
+        if event.old is not None:
+            self.remove(event.old.emp_id)
+        if event.new is not None:
+            self.add(event.new)
+
+    def matches(self, query: str, emp) -> bool:
+        return fold_text(query) in self._text_of(emp)
+
+    def search(self, query: str) -> Set[str]:
+        """
+        Returns the IDs of employees whose ID or name contains query.
+        """
+        folded = fold_text(query)
+        if not folded:
+            return set(self._texts)
+        if len(folded) < GRAM_SIZE:
+            return {emp_id for emp_id, text in self._texts.items() if folded in text}
+        postings = []
+        for gram in _grams(folded):
+            posting = self._postings.get(gram)
+            if not posting:
+                return set()
+            postings.append(posting)
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates &= posting
+            if not candidates:
+                return candidates
+        # Trigrams can all occur without the query occurring as a whole
+        return {emp_id for emp_id in candidates if folded in self._texts[emp_id]}
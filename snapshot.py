@@ -0,0 +1,209 @@
+# File: snapshot.py
+"""
+Binary roster snapshot kept next to a JSON data file (<data_file>.snap).
+
+Layout, little-endian, every section 8-byte aligned:
+
+    header      magic, format version, row count, and the inode, mtime
+                and size of the JSON file the snapshot was taken from
+    sections    (offset, length) of each section below
+    salaries    float64 per row
+    birthdays   int32 date ordinal per row, 0 if not DD/MM/YYYY
+    ids, names, birthday texts
+                a uint64 offset index (row count + 1 entries) and a
+                string table of NUL-separated UTF-8
+
+The file is memory-mapped: single rows are decoded on demand through the
+offset indexes, and whole columns are decoded in bulk for a full load.
+"""
+
+from array import array
+from functools import lru_cache
+from itertools import accumulate
+from operator import add
+from typing import List, Optional, Tuple
+import mmap
+import os
+import struct
+import sys
+
+MAGIC = b"EMSSNAP\x00"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<8sIIQqQQ")
+_SECTION = struct.Struct("<QQ")
+_SECTIONS = ("salaries", "birthday_ordinals", "id_offsets", "ids",
+             "name_offsets", "names", "birthday_offsets", "birthdays")
+_ALIGN = 8
+
+
+def snapshot_path(data_file: str) -> str:
+    return data_file + ".snap"
+
+
+def source_version(data_file: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        st = os.stat(data_file)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+def _string_table(values: List[str]) -> Tuple[array, bytes]:
+    blob = "\0".join(values).encode("utf-8")
+    # Start of row i: bytes of the i strings before it plus i separators
+    byte_totals = accumulate(map(len, map(str.encode, values)), initial=0)
+    offsets = array('Q', map(add, byte_totals, range(len(values) + 1)))
+    return offsets, blob
+
+
+def _little_endian(data: array) -> bytes:
+    if sys.byteorder != "little":
+        data = array(data.typecode, data)
+        data.byteswap()
+    return data.tobytes()
+
+
+def write_snapshot(path: str, employees, source: Optional[Tuple[int, int, int]]):
+    """
+    Writes employees to path, recording the version of the JSON file they
+    came from. Raises ValueError if a field contains a NUL character.
+    """
+    from columnar import birthday_to_ordinal
+
+    ids = [emp.emp_id for emp in employees]
+    names = [emp.name for emp in employees]
+    birthdays = [emp.birthday for emp in employees]
+    if any("\0" in value for column in (ids, names, birthdays) for value in column):
+        raise ValueError("Employee fields cannot contain NUL characters.")
+    id_offsets, id_blob = _string_table(ids)
+    name_offsets, name_blob = _string_table(names)
+    birthday_offsets, birthday_blob = _string_table(birthdays)
+    sections = [
+        _little_endian(array('d', (emp.salary_rate for emp in employees))),
+        # Rosters share few distinct birthdays, so each is parsed once
+        _little_endian(array('i', map(lru_cache(maxsize=None)(birthday_to_ordinal), birthdays))),
+        _little_endian(id_offsets), id_blob,
+        _little_endian(name_offsets), name_blob,
+        _little_endian(birthday_offsets), birthday_blob,
+    ]
+    ino, mtime_ns, size = source or (0, 0, 0)
+    position = _HEADER.size + _SECTION.size * len(sections)
+    table = []
+    for data in sections:
+        position += -position % _ALIGN
+        table.append(_SECTION.pack(position, len(data)))
+        position += len(data)
+
+    tmp_file = path + ".tmp"
+    with open(tmp_file, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, 0, ino, mtime_ns, size, len(ids)))
+        f.writelines(table)
+        for data in sections:
+            f.write(b"\0" * (-f.tell() % _ALIGN))
+            f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, path)
+
+
+class Snapshot:
+    """
+    Read-only, memory-mapped view of a snapshot file. Raises ValueError
+    if the file is not a snapshot of a supported version.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._views = []
+        try:
+            magic, version, _, ino, mtime_ns, size, self.count = _HEADER.unpack_from(self._mmap)
+            if magic != MAGIC or version != FORMAT_VERSION:
+                raise ValueError(f"{path} is not a roster snapshot.")
+            self.source = (ino, mtime_ns, size)
+            self._sections = {}
+            for i, name in enumerate(_SECTIONS):
+                offset, length = _SECTION.unpack_from(self._mmap, _HEADER.size + i * _SECTION.size)
+                if offset + length > len(self._mmap):
+                    raise ValueError(f"{path} is truncated.")
+                self._sections[name] = (offset, length)
+        except (struct.error, ValueError):
+            self.close()
+            raise ValueError(f"{path} is not a roster snapshot.")
+        self.salaries = self._column("salaries", 'd')
+        self.birthday_ordinals = self._column("birthday_ordinals", 'i')
+        self._id_offsets = self._column("id_offsets", 'Q')
+        self._name_offsets = self._column("name_offsets", 'Q')
+        self._birthday_offsets = self._column("birthday_offsets", 'Q')
+
+    def _column(self, name: str, typecode: str):
+        offset, length = self._sections[name]
+        if sys.byteorder != "little":
+            data = array(typecode, self._mmap[offset:offset + length])
+            data.byteswap()
+            return data
+        view = memoryview(self._mmap)[offset:offset + length].cast(typecode)
+        self._views.append(view)
+        return view
+
+    def _string(self, section: str, offsets, row: int) -> str:
+        base = self._sections[section][0]
+        return self._mmap[base + offsets[row]:base + offsets[row + 1] - 1].decode("utf-8")
+
+    def _strings(self, section: str) -> List[str]:
+        if not self.count:
+            return []
+        offset, length = self._sections[section]
+        return self._mmap[offset:offset + length].decode("utf-8").split("\0")
+
+    def __len__(self) -> int:
+        return self.count
+
+    def emp_id(self, row: int) -> str:
+        return self._string("ids", self._id_offsets, row)
+
+    def __getitem__(self, row: int):
+        from models import Employee
+
+        if not 0 <= row < self.count:
+            raise IndexError("snapshot row out of range")
+        return Employee(self.emp_id(row), self._string("names", self._name_offsets, row),
+                        self._string("birthdays", self._birthday_offsets, row), self.salaries[row])
+
+    def employees(self) -> list:
+        """
+        Decodes every row at once, column by column.
+        """
+        from storage import _employees
+
+        return _employees(zip(self._strings("ids"), self._strings("names"),
+                              self._strings("birthdays"), self.salaries.tolist()))
+
+    def close(self):
+        for view in self._views:
+            view.release()
+        self._views = []
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def load_snapshot(data_file: str) -> Optional[list]:
+    """
+    Returns the employees of data_file's snapshot, or None when there is no
+    snapshot or it was taken from a different version of data_file.
+    """
+    path = snapshot_path(data_file)
+    try:
+        snapshot = Snapshot(path)
+    except (OSError, ValueError):
+        return None
+    with snapshot:
+        if snapshot.source != source_version(data_file):
+            return None
+        return snapshot.employees()
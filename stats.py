@@ -0,0 +1,174 @@
+# File: stats.py
+
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+import datetime
+import math
+
+from models import ChangeEvent, Department, Employee
+from validation import parse_birthday
+
+
+def birth_month(birthday: str) -> int:
+    """
+    Month (1-12) of a birthday as accepted by validation, e.g. "05/03/1990"
+    or "5/3/1990", or 0 if it cannot be read.
+    """
+    date = parse_birthday(birthday)
+    return date.month if date is not None else 0
+
+
+class PayrollStats:
+    """
+    Payroll totals, salary percentiles, salary-band histogram and birth-month
+    distribution over a roster. Built in bulk from the roster's columns, then
+    kept current from Department change events, so reading any figure is
+    O(1) and an edit costs O(log n) rather than a rescan.
+    """
+
+    def __init__(self, employees: Iterable[Employee] = (), band_width: float = 10.0):
+        self.band_width = band_width
+        self._department: Optional[Department] = None
+        self.rebuild(employees)
+
+    @classmethod
+    def for_department(cls, department: Department, band_width: float = 10.0) -> "PayrollStats":
+        stats = cls(band_width=band_width)
+        stats.attach(department)
+        return stats
+
+    def attach(self, department: Department):
+        self._department = department
+        self.rebuild(department.list_employees())
+        department.subscribe(self.apply_change)
+
+    def detach(self):
+        if self._department is not None:
+            self._department.unsubscribe(self.apply_change)
+            self._department = None
+
+    def rebuild(self, employees: Iterable[Employee]):
+        salaries = getattr(employees, "salaries", None)
+        ordinals = getattr(employees, "birthday_ordinals", None)
+        if salaries is None:
+            employees = list(employees)
+            salaries = array('d', [emp.salary_rate for emp in employees])
+            # Rosters repeat birthdays, so each distinct one is read once
+            months = Counter()
+            for birthday, count in Counter(emp.birthday for emp in employees).items():
+                months[birth_month(birthday)] += count
+        else:
+            # Columnar roster: read the packed columns instead of records,
+            # counting each distinct birth date once
+            months = Counter()
+            for ordinal, count in Counter(ordinals).items():
+                if ordinal:
+                    months[datetime.date.fromordinal(ordinal).month] += count
+            for row, ordinal in enumerate(ordinals):
+                if not ordinal:
+                    months[birth_month(employees[row].birthday)] += 1
+        self._sorted_salaries: List[float] = sorted(salaries)
+        self._total = math.fsum(salaries)
+        width = self.band_width
+        self._bands = Counter(int(salary // width) for salary in salaries)
+        self._months = months
+
+    def add(self, emp: Employee):
+        insort(self._sorted_salaries, emp.salary_rate)
+        self._total += emp.salary_rate
+        self._bands[int(emp.salary_rate // self.band_width)] += 1
+        self._months[birth_month(emp.birthday)] += 1
+
+    def remove(self, emp: Employee):
+        del self._sorted_salaries[bisect_left(self._sorted_salaries, emp.salary_rate)]
+        self._total -= emp.salary_rate
+        self._decrement(self._bands, int(emp.salary_rate // self.band_width))
+        self._decrement(self._months, birth_month(emp.birthday))
+
+    @staticmethod
+    def _decrement(counter: Counter, key):
+        counter[key] -= 1
+        if counter[key] <= 0:
+            del counter[key]
+
+    def apply_change(self, event: ChangeEvent):
+        if event.kind == ChangeEvent.RESET:
+            if self._department is not None:
+                self.rebuild(self._department.list_employees())
+            return
+        if event.old is not None:
+            self.remove(event.old)
+        if event.new is not None:
+            self.add(event.new)
+
+    @property
+    def count(self) -> int:
+        return len(self._sorted_salaries)
+
+    @property
+    def total_monthly(self) -> float:
+        return self._total if self._sorted_salaries else 0.0
+
+    @property
+    def total_annual(self) -> float:
+        return self.total_monthly * 12
+
+    @property
+    def mean(self) -> float:
+        return self._total / self.count if self.count else 0.0
+
+    @property
+    def median(self) -> float:
+        return self.percentile(50)
+
+    def percentile(self, p: float) -> float:
+        """
+        The p-th percentile (0-100) of monthly salary rates, interpolating
+        linearly between the closest ranks.
+        """
+        salaries = self._sorted_salaries
+        if not salaries:
+            return 0.0
+        rank = (len(salaries) - 1) * p / 100
+        low = math.floor(rank)
+        high = min(low + 1, len(salaries) - 1)
+        return salaries[low] + (salaries[high] - salaries[low]) * (rank - low)
+
+    @property
+    def minimum(self) -> float:
+        return self._sorted_salaries[0] if self._sorted_salaries else 0.0
+
+    @property
+    def maximum(self) -> float:
+        return self._sorted_salaries[-1] if self._sorted_salaries else 0.0
+
+    def salary_bands(self) -> List[Tuple[float, float, int]]:
+        """
+        Histogram of monthly salary rates as (low, high, count) bands of
+        band_width, in ascending order.
+        """
+        width = self.band_width
+        return [(band * width, (band + 1) * width, count) for band, count in sorted(self._bands.items())]
+
+    def birth_months(self) -> Dict[int, int]:
+        """
+        Employees per birth month (1-12); key 0 counts unreadable birthdays.
+        """
+        return dict(sorted(self._months.items()))
+
+    def summary(self) -> dict:
+        return {
+            'count': self.count,
+            'total_monthly': self.total_monthly,
+            'total_annual': self.total_annual,
+            'mean': self.mean,
+            'median': self.median,
+            'p10': self.percentile(10),
+            'p90': self.percentile(90),
+            'min': self.minimum,
+            'max': self.maximum,
+            'salary_bands': self.salary_bands(),
+            'birth_months': self.birth_months(),
+        }
@@ -0,0 +1,457 @@
+# File: storage.py
+
+from abc import ABC, abstractmethod
+from json.encoder import encode_basestring_ascii
+from typing import Dict, Iterator, List, Optional, Tuple
+import gc
+import json
+import math
+import os
+import sqlite3
+import threading
+
+from journal import ChangeJournal
+from locking import FileLock
+from snapshot import load_snapshot, snapshot_path, source_version, write_snapshot
+
+
+class EmployeeStore(ABC):
+    """
+    Persistence backend used by Department. Changes are handed over as
+    journal-style entries: {'op': 'add', 'emp': {...}},
+    {'op': 'update', 'id': ..., 'emp': {...}}, {'op': 'remove', 'id': ...}
+    and {'op': 'batch', 'entries': [...]} for a committed transaction.
+    """
+
+    @abstractmethod
+    def load(self) -> Optional[List["Employee"]]:
+        """Returns every stored employee, or None if nothing was ever saved."""
+
+    @abstractmethod
+    def apply(self, entry: dict, employees: List["Employee"]):
+        """Persists a single change; employees is the roster after it."""
+
+    @abstractmethod
+    def save(self, employees: List["Employee"]):
+        """Replaces the stored roster with employees."""
+
+    def compact(self, employees: List["Employee"]):
+        self.save(employees)
+
+    def set_roster_lock(self, lock):
+        """
+        Called by Department with the lock it holds while changing the
+        roster. Stores that read the roster on another thread copy it
+        under this lock.
+        """
+
+    def needs_roster(self) -> bool:
+        """
+        Whether the next apply() reads its employees argument. Stores that
+        write the entry alone return False, and apply() may then be passed
+        None instead of the roster.
+        """
+        return True
+
+    def changed_externally(self) -> bool:
+        """
+        True if another process changed the stored roster since this store
+        last read or wrote it.
+        """
+        return False
+
+    def external_changes(self) -> Optional[List[dict]]:
+        """
+        Journal-style entries written by other processes since the last
+        sync, or None when only a full load() can tell what changed.
+        """
+        return None if self.changed_externally() else []
+
+    def close(self):
+        pass
+
+
+class ConflictError(IOError):
+    """
+    Raised when a full save would overwrite changes another process made
+    to the stored roster.
+    """
+
+
+def _file_version(path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+def _employees(rows) -> List["Employee"]:
+    # models imports this module, so Employee is resolved at call time
+    from models import Employee
+
+    # Allocating a large roster would otherwise set off repeated full
+    # collections that find nothing to free
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return [Employee(*row) for row in rows]
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def _json_line(emp) -> str:
+    # Equivalent to json.dumps(emp.to_dict()) without building the dict and
+    # encoder for every record
+    salary = emp.salary_rate
+    return '    {"emp_id": %s, "name": %s, "birthday": %s, "salary_rate": %s}' % (
+        encode_basestring_ascii(emp.emp_id),
+        encode_basestring_ascii(emp.name),
+        encode_basestring_ascii(emp.birthday),
+        repr(salary) if math.isfinite(salary) else json.dumps(salary),
+    )
+
+
+def _replay(entry: dict, records: Dict[str, dict]):
+    # Idempotent, so entries already folded into the snapshot by an
+    # interrupted compaction can safely be applied again.
+    op = entry['op']
+    if op == 'batch':
+        for batched_entry in entry['entries']:
+            _replay(batched_entry, records)
+    elif op == 'remove':
+        records.pop(entry['id'], None)
+    else:
+        if op == 'update' and entry['id'] != entry['emp']['emp_id']:
+            records.pop(entry['id'], None)
+        records[entry['emp']['emp_id']] = entry['emp']
+
+
+class JsonFileStore(EmployeeStore):
+    """
+    The roster as a JSON array in data_file. When journaled, changes are
+    appended to <data_file>.log and folded into a fresh snapshot once the
+    log passes max_entries or max_bytes.
+
+    Unless snapshot is False, a binary copy of the roster is kept in
+    <data_file>.snap and loaded instead of parsing the JSON while it is
+    current; it is refreshed whenever the JSON had to be parsed and every
+    time the JSON is rewritten.
+
+    Several processes may share data_file: every read and write holds an
+    advisory lock on <data_file>.lock, and a change written while another
+    process has modified the file is merged on top of that process's
+    records instead of overwriting them.
+    """
+
+    def __init__(self, data_file: str, journaled: bool = False,
+                 max_entries: int = 1000, max_bytes: int = 4 * 1024 * 1024, snapshot: bool = True):
+        self.data_file = data_file
+        self.snapshot = snapshot
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.journal = ChangeJournal(data_file + ".log") if journaled else None
+        self.lock = FileLock(data_file + ".lock")
+        # File versions as of this store's last read or write, None until
+        # the first load()
+        self._known_version = None
+        # Snapshot version and journal offset the loaded roster reflects
+        self._synced_snapshot = None
+        self._journal_offset = 0
+        # Set once a write merged in records the caller has not loaded yet
+        self._behind = False
+
+    def _version(self):
+        return _file_version(self.data_file), _file_version(self.journal.path) if self.journal else None
+
+    def _mark_synced(self):
+        self._known_version = self._version()
+        self._synced_snapshot = self._known_version[0]
+        self._journal_offset = self.journal.size if self.journal else 0
+        self._behind = False
+
+    def changed_externally(self) -> bool:
+        if self._known_version is None:
+            return False
+        return self._behind or self._version() != self._known_version
+
+    def _read_data(self):
+        employees_data = []
+        if os.path.exists(self.data_file):
+            with open(self.data_file, 'r') as f:
+                employees_data = json.load(f)
+        if self.journal is not None:
+            records = {emp['emp_id']: emp for emp in employees_data}
+            for entry in self.journal.replay():
+                _replay(entry, records)
+            employees_data = records.values()
+        return employees_data
+
+    def load(self) -> Optional[List["Employee"]]:
+        with self.lock:
+            if not os.path.exists(self.data_file) and (self.journal is None or not os.path.exists(self.journal.path)):
+                self._mark_synced()
+                return None
+            # Journal entries are newer than any snapshot
+            if self.snapshot and (self.journal is None or not self.journal.size):
+                employees = load_snapshot(self.data_file)
+                if employees is not None:
+                    self._mark_synced()
+                    return employees
+            employees = _employees(
+                (emp['emp_id'], emp['name'], emp['birthday'], emp['salary_rate']) for emp in self._read_data()
+            )
+            self._mark_synced()
+            if self.journal is None or not self.journal.size:
+                self._write_binary_snapshot(employees)
+        return employees
+
+    def external_changes(self) -> Optional[List[dict]]:
+        with self.lock:
+            if not self.changed_externally():
+                return []
+            # Only appends to an unchanged snapshot can be read incrementally
+            if (self.journal is None or _file_version(self.data_file) != self._synced_snapshot
+                    or self.journal.size < self._journal_offset):
+                return None
+            entries, self._journal_offset = self.journal.read_from(self._journal_offset)
+            self._known_version = self._version()
+            self._behind = False
+            return entries
+
+    def apply(self, entry: dict, employees: List["Employee"]):
+        with self.lock:
+            external = self.changed_externally()
+            if self.journal is None:
+                if external:
+                    # Write the other process's roster with this change on
+                    # top rather than the in-memory one, which lacks theirs
+                    records = {emp['emp_id']: emp for emp in self._read_data()}
+                    _replay(entry, records)
+                    merged = _employees(
+                        (emp['emp_id'], emp['name'], emp['birthday'], emp['salary_rate']) for emp in records.values()
+                    )
+                    self._write_snapshot(merged)
+                    self._known_version = self._version()
+                    self._behind = True
+                    self._write_binary_snapshot(merged)
+                else:
+                    self._write_snapshot(employees)
+                    self._mark_synced()
+                    # Keep the next cold start on the fast path
+                    self._write_binary_snapshot(employees)
+                return
+            if external:
+                # The open handle may point at a journal another process
+                # has since folded away
+                self.journal.close()
+            self.journal.append(entry)
+            if external:
+                self._known_version = self._version()
+                self._behind = True
+            else:
+                self._mark_synced()
+            if employees is not None and self._compaction_due():
+                self.compact(employees)
+
+    def _compaction_due(self, appending: int = 0) -> bool:
+        return self.journal.entry_count + appending >= self.max_entries or self.journal.size >= self.max_bytes
+
+    def needs_roster(self) -> bool:
+        # Only a full rewrite or a compaction reads the roster
+        return self.journal is None or self._compaction_due(appending=1)
+
+    def save(self, employees: List["Employee"]):
+        with self.lock:
+            if self.changed_externally():
+                raise ConflictError(f"{self.data_file} was changed by another instance; reload before saving.")
+            self._replace_snapshot(employees)
+
+    def compact(self, employees: List["Employee"]):
+        with self.lock:
+            # Folding now would drop entries this process has not merged
+            # yet; a later compaction picks them up
+            if self.changed_externally():
+                return
+            self._replace_snapshot(employees)
+
+    def _replace_snapshot(self, employees: List["Employee"]):
+        self._write_snapshot(employees)
+        if self.journal is not None:
+            self.journal.clear()
+        self._mark_synced()
+        self._write_binary_snapshot(employees)
+
+    def _write_binary_snapshot(self, employees: List["Employee"]):
+        if not self.snapshot:
+            return
+        try:
+            write_snapshot(snapshot_path(self.data_file), employees, source_version(self.data_file))
+        except (OSError, ValueError):
+            # Only a cache: the next load parses the JSON again
+            pass
+
+    def _write_snapshot(self, employees: List["Employee"]):
+        tmp_file = self.data_file + ".tmp"
+        with open(tmp_file, 'w') as f:
+            # One record per line: json.dump(indent=...) is pure Python and
+            # dominated save time on large rosters
+            f.write("[\n")
+            f.write(",\n".join(map(_json_line, employees)))
+            f.write("\n]\n")
+            f.flush()
+            os.fsync(f.fileno())
+        # The snapshot only replaces data_file once fully written
+        os.replace(tmp_file, self.data_file)
+
+    def close(self):
+        if self.journal is not None:
+            self.journal.close()
+
+
+class SQLiteStore(EmployeeStore):
+    """
+    The roster as rows of an SQLite table, indexed on emp_id and name.
+    Changes are written row by row, and count(), get(), read_page() and
+    find_by_name() read from disk without loading the whole roster. The
+    connection may be shared with a background writer thread; every use of
+    it is serialized by a lock.
+    """
+
+    def __init__(self, db_file: str):
+        self.db_file = db_file
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._lock = threading.RLock()
+        # PRAGMA data_version as of the last load(); it only moves when
+        # another connection commits
+        self._data_version = None
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS employees ("
+                " emp_id TEXT PRIMARY KEY,"
+                " name TEXT NOT NULL,"
+                " birthday TEXT NOT NULL,"
+                " salary_rate REAL NOT NULL)"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_employees_name ON employees (name)")
+
+    def load(self) -> List["Employee"]:
+        with self._lock:
+            self._data_version = self._current_data_version()
+        return list(self.iter_employees())
+
+    def _current_data_version(self) -> int:
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def changed_externally(self) -> bool:
+        # Polled from the GUI thread: rather than wait out a background
+        # write holding the connection, report no change and let the next
+        # poll look again. A second connection would not do, since its
+        # data_version also moves on this store's own commits
+        if not self._lock.acquire(blocking=False):
+            return False
+        try:
+            return self._changed()
+        finally:
+            self._lock.release()
+
+    def external_changes(self) -> Optional[List[dict]]:
+        # Asked once a change was seen, so this one waits for the lock
+        with self._lock:
+            return None if self._changed() else []
+
+    def _changed(self) -> bool:
+        return self._data_version is not None and self._current_data_version() != self._data_version
+
+    def apply(self, entry: dict, employees: List["Employee"]):
+        with self._lock, self.conn:
+            self._execute(entry)
+
+    def needs_roster(self) -> bool:
+        return False
+
+    def _execute(self, entry: dict):
+        op = entry['op']
+        if op == 'batch':
+            for batched_entry in entry['entries']:
+                self._execute(batched_entry)
+        elif op == 'remove':
+            self.conn.execute("DELETE FROM employees WHERE emp_id = ?", (entry['id'],))
+        elif op == 'update':
+            emp = entry['emp']
+            self.conn.execute(
+                "UPDATE employees SET emp_id = ?, name = ?, birthday = ?, salary_rate = ?"
+                " WHERE emp_id = ?",
+                (emp['emp_id'], emp['name'], emp['birthday'], emp['salary_rate'], entry['id'])
+            )
+        else:
+            emp = entry['emp']
+            self.conn.execute(
+                "INSERT INTO employees (emp_id, name, birthday, salary_rate) VALUES (?, ?, ?, ?)",
+                (emp['emp_id'], emp['name'], emp['birthday'], emp['salary_rate'])
+            )
+
+    def save(self, employees: List["Employee"]):
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM employees")
+            self.conn.executemany(
+                "INSERT INTO employees (emp_id, name, birthday, salary_rate) VALUES (?, ?, ?, ?)",
+                ((emp.emp_id, emp.name, emp.birthday, emp.salary_rate) for emp in employees)
+            )
+
+    def count(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM employees").fetchone()[0]
+
+    def get(self, emp_id: str) -> Optional["Employee"]:
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT emp_id, name, birthday, salary_rate FROM employees WHERE emp_id = ?", (emp_id,)
+            ).fetchall()
+        return _employees(rows)[0] if rows else None
+
+    def read_page(self, limit: int, after: int = 0) -> Tuple[List["Employee"], int]:
+        """
+        Returns up to limit employees in insertion order following the
+        cursor after, plus the cursor to pass in for the next page.
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT rowid, emp_id, name, birthday, salary_rate FROM employees"
+                " WHERE rowid > ? ORDER BY rowid LIMIT ?", (after, limit)
+            ).fetchall()
+        if not rows:
+            return [], after
+        return _employees(row[1:] for row in rows), rows[-1][0]
+
+    def find_by_name(self, prefix: str, limit: int = 100) -> List["Employee"]:
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT emp_id, name, birthday, salary_rate FROM employees"
+                " WHERE name >= ? AND name < ? ORDER BY name LIMIT ?",
+                (prefix, prefix + "\U0010ffff", limit)
+            ).fetchall()
+        return _employees(rows)
+
+    def iter_employees(self, page_size: int = 10000) -> Iterator["Employee"]:
+        after = 0
+        while True:
+            page, after = self.read_page(page_size, after)
+            if not page:
+                return
+            yield from page
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+def create_store(data_file: str, journaled: bool = False) -> EmployeeStore:
+    """
+    Picks the backend from the data file's extension: .db/.sqlite/.sqlite3
+    files use SQLite, anything else the JSON file store.
+    """
+    if os.path.splitext(data_file)[1].lower() in (".db", ".sqlite", ".sqlite3"):
+        return SQLiteStore(data_file)
+    return JsonFileStore(data_file, journaled=journaled)
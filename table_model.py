@@ -0,0 +1,357 @@
+# File: table_model.py
+
+from operator import attrgetter
+from typing import Optional
+
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, QSortFilterProxyModel, Qt
+
+from collation import vietnamese_sort_key
+from validation import parse_birthday
+
+# Role returning the Employee record behind a row
+EmployeeRole = Qt.ItemDataRole.UserRole + 1
+
+# Rows requested per page when the table is filled as it scrolls
+FETCH_SIZE = 200
+
+
+def _birthday_key(birthday: str):
+    # Chronological; birthdays that do not parse sort first, by text
+    date = parse_birthday(birthday)
+    return (date.toordinal() if date is not None else 0), birthday
+
+
+class EmployeeTableModel(QAbstractTableModel):
+    """
+    Exposes a list of employees to a QTableView. Cells are produced on
+    demand in data(), so only the rows on screen are ever materialized.
+    Given a page source instead of a list (set_pages), rows are also
+    fetched only as the view scrolls down to them.
+    """
+
+    HEADERS = ["ID", "Name", "Birthday", "Salary Rate", "Annual Salary"]
+    # Field each column sorts by, and the transform from field value to
+    # sort key where the raw value does not order correctly
+    SORT_FIELDS = ["emp_id", "name", "birthday", "salary_rate", "salary_rate"]
+    SORT_TRANSFORMS = {"name": vietnamese_sort_key, "birthday": _birthday_key}
+
+    def __init__(self, employees=None, parent=None):
+        super().__init__(parent)
+        self._employees = list(employees) if employees is not None else []
+        self._sort_column = -1
+        self._sort_order = Qt.SortOrder.AscendingOrder
+        # Sort keys by field value: rosters repeat names and birthdays, and
+        # the keys survive reloads, re-sorts and edits of other fields
+        self._key_caches = {field: {} for field in self.SORT_TRANSFORMS}
+        # Page source: fetch_page(after, limit) -> models.EmployeePage in
+        # emp_id order, None when the rows were given as a list
+        self._fetch_page = None
+        # Cursor of the next page, None once every page is loaded
+        self._cursor = None
+        # Rows in the whole listing, loaded or not
+        self.total = len(self._employees)
+
+    def set_employees(self, employees):
+        self.beginResetModel()
+        self._fetch_page = None
+        self._cursor = None
+        self._employees = list(employees)
+        self.total = len(self._employees)
+        self._prune_key_caches()
+        if self._sort_column >= 0:
+            self._sort_rows()
+        self.endResetModel()
+
+    def set_pages(self, fetch_page):
+        """
+        Shows the rows of fetch_page(after, limit), loading the first page
+        now and the rest through fetchMore() as the view scrolls. Pages come
+        in emp_id order, so sorting by anything else loads them all.
+        """
+        self.beginResetModel()
+        self._fetch_page = fetch_page
+        if self._sort_column < 0:
+            self._sort_column = 0
+            self._sort_order = Qt.SortOrder.AscendingOrder
+        page = fetch_page(None, FETCH_SIZE)
+        self._employees = list(page.employees)
+        self._cursor = page.next_cursor
+        self.total = page.total
+        if not self._in_page_order():
+            self._employees.extend(self._fetch_rest())
+            self._sort_rows()
+        self.endResetModel()
+
+    def refetch(self):
+        """
+        Starts over from the first page, e.g. after the page source's
+        filter changed. Does nothing for a model given a list.
+        """
+        if self._fetch_page is not None:
+            self.set_pages(self._fetch_page)
+
+    def canFetchMore(self, parent=QModelIndex()) -> bool:
+        return not parent.isValid() and self._cursor is not None
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._cursor is None:
+            return
+        page = self._fetch_page(self._cursor, FETCH_SIZE)
+        self._cursor = page.next_cursor
+        self.total = page.total
+        if page.employees:
+            first = len(self._employees)
+            self.beginInsertRows(QModelIndex(), first, first + len(page.employees) - 1)
+            self._employees.extend(page.employees)
+            self.endInsertRows()
+
+    def _fetch_rest(self) -> list:
+        # Every row not yet fetched; total is an estimate, so keep asking
+        # until the source says there is nothing left
+        rest = []
+        while self._cursor is not None:
+            page = self._fetch_page(self._cursor, max(FETCH_SIZE, self.total - len(self._employees) - len(rest)))
+            rest.extend(page.employees)
+            self._cursor = page.next_cursor
+            self.total = page.total
+        return rest
+
+    def _in_page_order(self) -> bool:
+        return self._sort_column == 0 and self._sort_order == Qt.SortOrder.AscendingOrder
+
+    def _not_loaded(self, emp) -> bool:
+        # Rows past the last page fetched arrive with a later page
+        return self._cursor is not None and emp.emp_id > self._cursor
+
+    def employee_at(self, row: int):
+        return self._employees[row]
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._employees)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        emp = self._employees[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            column = index.column()
+            if column == 0:
+                return emp.emp_id
+            if column == 1:
+                return emp.name
+            if column == 2:
+                return emp.birthday
+            if column == 3:
+                return f"{emp.salary_rate:.2f}"
+            return f"{emp.get_annual_salary():.2f}"
+        if role == EmployeeRole:
+            return emp
+        return None
+
+    def sort(self, column: int, order=Qt.SortOrder.AscendingOrder):
+        """
+        Sorts the rows with a single keyed sort instead of letting the proxy
+        compare cells pairwise through data().
+        """
+        if column == self._sort_column and order == self._sort_order:
+            # Rows are kept in order as they change, and QTableView asks
+            # twice for each header click
+            return
+        if self._cursor is not None and not (column == 0 and order == Qt.SortOrder.AscendingOrder):
+            # Pages arrive in emp_id order, so any other order needs them all
+            rest = self._fetch_rest()
+            if rest:
+                first = len(self._employees)
+                self.beginInsertRows(QModelIndex(), first, first + len(rest) - 1)
+                self._employees.extend(rest)
+                self.endInsertRows()
+        self._sort_column = column
+        self._sort_order = order
+        self.layoutAboutToBeChanged.emit()
+        persistent = self.persistentIndexList()
+        permutation = self._sort_rows()
+        if persistent:
+            if len(persistent) > 16:
+                # Old row -> new row for every row, inverting the permutation
+                new_rows = sorted(range(len(permutation)), key=permutation.__getitem__)
+                new_row = new_rows.__getitem__
+            else:
+                new_row = permutation.index
+            self.changePersistentIndexList(
+                persistent,
+                [self.index(new_row(index.row()), index.column()) for index in persistent]
+            )
+        self.layoutChanged.emit()
+
+    def insert_employee(self, emp):
+        if self._not_loaded(emp):
+            return
+        row = self._insert_row(emp)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._employees.insert(row, emp)
+        self.endInsertRows()
+
+    def remove_employee(self, emp):
+        row = self._find_row(emp)
+        if row is None:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._employees[row]
+        self.endRemoveRows()
+
+    def replace_employee(self, old, new):
+        if self._not_loaded(old) or self._not_loaded(new):
+            # A changed ID can move the row into or out of the pages fetched
+            self.remove_employee(old)
+            self.insert_employee(new)
+            return
+        row = self._find_row(old)
+        if row is None:
+            # Never fetched, e.g. filtered out of the pages by a search
+            self.insert_employee(new)
+            return
+        # Position for the new record among the rows as they are now, which
+        # is also the destination Qt expects for beginMoveRows()
+        destination = self._insert_row(new)
+        if destination in (row, row + 1):
+            self._employees[row] = new
+        else:
+            self.beginMoveRows(QModelIndex(), row, row, QModelIndex(), destination)
+            del self._employees[row]
+            row = destination - 1 if destination > row else destination
+            self._employees.insert(row, new)
+            self.endMoveRows()
+        self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.HEADERS) - 1))
+
+    def _insert_row(self, emp) -> int:
+        # Rightmost position that keeps the current sort order
+        if self._sort_column < 0:
+            return len(self._employees)
+        key_of = self._key_function(self._sort_column)
+        key = key_of(emp)
+        descending = self._sort_order == Qt.SortOrder.DescendingOrder
+        lo, hi = 0, len(self._employees)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            mid_key = key_of(self._employees[mid])
+            if (key > mid_key) if descending else (key < mid_key):
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo
+
+    def _find_row(self, emp) -> Optional[int]:
+        """
+        Row of emp, or None if it is not in the model: past the pages
+        fetched so far, or left out of them by the page source's filter.
+        """
+        if self._not_loaded(emp):
+            return None
+        key_of = key = None
+        if self._sort_column < 0:
+            lo = 0
+        else:
+            # Leftmost row with the same sort key, then scan the ties
+            key_of = self._key_function(self._sort_column)
+            key = key_of(emp)
+            descending = self._sort_order == Qt.SortOrder.DescendingOrder
+            lo, hi = 0, len(self._employees)
+            while lo < hi:
+                mid = (lo + hi) // 2
+                mid_key = key_of(self._employees[mid])
+                if (mid_key > key) if descending else (mid_key < key):
+                    lo = mid + 1
+                else:
+                    hi = mid
+        for row in range(lo, len(self._employees)):
+            other = self._employees[row]
+            if other.emp_id == emp.emp_id:
+                return row
+            if key_of is not None and key_of(other) != key:
+                break
+        return None
+
+    def _key_function(self, column: int):
+        """
+        Returns emp -> sort key for column, computing keys missing from the
+        cache as they are met.
+        """
+        field = self.SORT_FIELDS[column]
+        value_of = attrgetter(field)
+        transform = self.SORT_TRANSFORMS.get(field)
+        if transform is None:
+            return value_of
+        cache = self._key_caches[field]
+
+        def key_of(emp):
+            value = value_of(emp)
+            key = cache.get(value)
+            if key is None:
+                key = cache[value] = transform(value)
+            return key
+        return key_of
+
+    def _prune_key_caches(self):
+        # Drop keys for values no longer shown once they outnumber the rows
+        for field, cache in self._key_caches.items():
+            if len(cache) > 2 * len(self._employees):
+                values = set(map(attrgetter(field), self._employees))
+                self._key_caches[field] = {value: key for value, key in cache.items() if value in values}
+
+    def _sort_rows(self) -> list:
+        """
+        Sorts the rows by the current column and returns the permutation
+        applied: the old row of each row in the new order.
+        """
+        field = self.SORT_FIELDS[self._sort_column]
+        keys = list(map(attrgetter(field), self._employees))
+        transform = self.SORT_TRANSFORMS.get(field)
+        if transform is not None:
+            # Only distinct values are keyed and ordered; each row then sorts
+            # by the integer rank of its value
+            cache = self._key_caches[field]
+            distinct = set(keys)
+            for value in distinct.difference(cache):
+                cache[value] = transform(value)
+            ranks = {value: rank for rank, value in enumerate(sorted(distinct, key=cache.__getitem__))}
+            keys = list(map(ranks.__getitem__, keys))
+        # Sorting row numbers by a key list keeps every comparison in C
+        permutation = sorted(range(len(keys)), key=keys.__getitem__,
+                             reverse=self._sort_order == Qt.SortOrder.DescendingOrder)
+        self._employees = list(map(self._employees.__getitem__, permutation))
+        return permutation
+
+
+class EmployeeFilterProxyModel(QSortFilterProxyModel):
+    """
+    Shows only the employees whose IDs are in the current search result.
+    Sorting is forwarded to the source model.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._matching_ids = None
+
+    def set_matching_ids(self, matching_ids):
+        """
+        Filters to the given set of IDs; None shows every row. The set is
+        consulted live, so rows added to it later are shown once they change.
+        """
+        self._matching_ids = matching_ids
+        self.invalidate()
+
+    def sort(self, column: int, order=Qt.SortOrder.AscendingOrder):
+        self.sourceModel().sort(column, order)
+
+    def filterAcceptsRow(self, source_row: int, source_parent: QModelIndex) -> bool:
+        if self._matching_ids is None:
+            return True
+        return self.sourceModel().employee_at(source_row).emp_id in self._matching_ids
@@ -0,0 +1,117 @@
+# File: validation.py
+
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+import datetime
+import math
+import re
+
+from models import Employee
+
+FIELDS = ("emp_id", "name", "birthday", "salary_rate")
+
+# Same shape strptime("%d/%m/%Y") accepts, without its per-call overhead
+_BIRTHDAY_RE = re.compile(r"(\d{1,2})/(\d{1,2})/(\d{4})")
+
+
+# Messages per field, shared by the GUI, the CLI and bulk imports
+MESSAGES = {
+    'emp_id': "Employee ID is required.",
+    'name': "Name is required.",
+    'birthday': "Birthday must be a valid date in DD/MM/YYYY format.",
+    'salary_rate': "Salary Rate must be a non-negative number.",
+}
+
+
+# Real data repeats birthdays a lot, so parsed dates are cached
+@lru_cache(maxsize=65536)
+def parse_birthday(birthday: str) -> Optional[datetime.date]:
+    match = _BIRTHDAY_RE.fullmatch(birthday)
+    if match is None:
+        return None
+    day, month, year = match.groups()
+    try:
+        return datetime.date(int(year), int(month), int(day))
+    except ValueError:
+        return None
+
+
+def parse_salary(salary) -> Optional[float]:
+    if isinstance(salary, bool):
+        # float(True) is 1.0, but a JSON true is not a salary
+        return None
+    try:
+        salary_float = float(salary)
+    except (TypeError, ValueError):
+        return None
+    # inf and 1e400 would be stored and served as Infinity, which is not JSON
+    return salary_float if salary_float >= 0 and math.isfinite(salary_float) else None
+
+
+def _text(value) -> str:
+    if isinstance(value, str):
+        return value.strip()
+    return "" if value is None else str(value).strip()
+
+
+def validate_record(record: dict) -> Tuple[Optional[Employee], Dict[str, str]]:
+    """
+    Checks one raw record (strings as typed or read from a file) and returns
+    the Employee it describes, or None with an error message per bad field.
+    """
+    emp_id = _text(record.get('emp_id'))
+    name = _text(record.get('name'))
+    birthday = _text(record.get('birthday'))
+    salary = parse_salary(record.get('salary_rate'))
+    errors = _field_errors(emp_id, name, parse_birthday(birthday), salary)
+    if errors:
+        return None, errors
+    return Employee(emp_id, name, birthday, salary), {}
+
+
+def _field_errors(emp_id: str, name: str, birthday, salary) -> Dict[str, str]:
+    errors = {}
+    if not emp_id:
+        errors['emp_id'] = MESSAGES['emp_id']
+    if not name:
+        errors['name'] = MESSAGES['name']
+    if birthday is None:
+        errors['birthday'] = MESSAGES['birthday']
+    if salary is None:
+        errors['salary_rate'] = MESSAGES['salary_rate']
+    return errors
+
+
+def validate_columns(columns: Dict[str, Sequence]) -> Tuple[List[Tuple[int, Employee]], List[Tuple[int, Dict[str, str]]]]:
+    """
+    Validates equally long columns keyed by field name, one field at a
+    time. Returns (position, Employee) for valid rows and (position,
+    errors) for the others.
+    """
+    emp_ids = [_text(value) for value in columns['emp_id']]
+    names = [_text(value) for value in columns['name']]
+    birthdays = [_text(value) for value in columns['birthday']]
+    parsed_birthdays = [parse_birthday(value) for value in birthdays]
+    salaries = [parse_salary(value) for value in columns['salary_rate']]
+    valid = []
+    invalid = []
+    for position, (emp_id, name, birthday, parsed, salary) in enumerate(
+            zip(emp_ids, names, birthdays, parsed_birthdays, salaries)):
+        if emp_id and name and parsed is not None and salary is not None:
+            valid.append((position, Employee(emp_id, name, birthday, salary)))
+        else:
+            invalid.append((position, _field_errors(emp_id, name, parsed, salary)))
+    return valid, invalid
+
+
+def validate_batch(rows: List[Tuple[int, dict]]) -> Tuple[List[Tuple[int, Employee]], List[Tuple[int, Dict[str, str]]]]:
+    """
+    Validates (line number, record) pairs and splits them into valid
+    employees and per-line errors. Kept at module level so it can run in a
+    process pool.
+    """
+    line_numbers = [line_no for line_no, _ in rows]
+    columns = {name: [record.get(name) for _, record in rows] for name in FIELDS}
+    valid, invalid = validate_columns(columns)
+    return ([(line_numbers[position], employee) for position, employee in valid],
+            [(line_numbers[position], errors) for position, errors in invalid])
@@ -2,14 +2,26 @@
 
 from PyQt6.QtWidgets import (
     QWidget, QMainWindow, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit,
-    QPushButton, QTabWidget, QMessageBox, QTableWidget, QTableWidgetItem,
-    QHeaderView, QMenuBar, QGroupBox, QGridLayout, QToolBar, QAbstractItemView
+    QPushButton, QTabWidget, QMessageBox, QTableView, QComboBox, QInputDialog,
+    QHeaderView, QMenuBar, QGroupBox, QGridLayout, QToolBar, QAbstractItemView, QFileDialog
 )
 from PyQt6.QtGui import QAction, QIcon, QPalette, QColor, QFont
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal
+
+from instrumentation import metrics, timed
+from models import ChangeEvent
+from table_model import EmployeeFilterProxyModel, EmployeeRole, EmployeeTableModel
+
+
+def _ignore_checked(command):
+    # clicked and triggered pass a 'checked' flag the commands do not take
+    return lambda checked=False: command()
 
 
 class EmployeeView(QMainWindow):
+    # Emitted once the Employee List tab exists and needs its rows
+    employee_list_created = pyqtSignal()
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Employee Management System")
@@ -36,10 +48,16 @@ class EmployeeView(QMainWindow):
         self.tabs.addTab(self.manage_tab, "Manage Employees")
         self.create_manage_section()
 
-        # Employee List Tab
+        # Employee List Tab, built the first time it is opened
         self.list_tab = QWidget()
         self.tabs.addTab(self.list_tab, "Employee List")
-        self.create_employee_list()
+        self.employee_list_built = False
+        self.tabs.currentChanged.connect(self.on_tab_changed)
+
+        # Debounce the search input: the search command runs once typing pauses
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(250)
 
     def apply_color_palette(self):
         """
@@ -91,6 +109,24 @@ class EmployeeView(QMainWindow):
         exit_action.triggered.connect(self.close)
         file_menu.addAction(exit_action)
 
+        # Reports Menu
+        reports_menu = menubar.addMenu("Reports")
+        self.statistics_action = QAction(QIcon.fromTheme("x-office-spreadsheet"), "Payroll Statistics", self)
+        reports_menu.addAction(self.statistics_action)
+        self.duplicates_action = QAction(QIcon.fromTheme("edit-find"), "Possible Duplicates", self)
+        reports_menu.addAction(self.duplicates_action)
+
+        # Tools Menu
+        tools_menu = menubar.addMenu("Tools")
+        self.collect_metrics_action = QAction("Collect Metrics", self)
+        self.collect_metrics_action.setCheckable(True)
+        self.collect_metrics_action.setChecked(metrics.enabled)
+        tools_menu.addAction(self.collect_metrics_action)
+        self.profile_action = QAction("Profile Next Action", self)
+        tools_menu.addAction(self.profile_action)
+        self.export_metrics_action = QAction("Export Metrics...", self)
+        tools_menu.addAction(self.export_metrics_action)
+
         # Help Menu
         help_menu = menubar.addMenu("Help")
         about_action = QAction(QIcon.fromTheme("help-about"), "About", self)
@@ -131,6 +167,22 @@ class EmployeeView(QMainWindow):
         self.list_action.setShortcut("Ctrl+L")
         toolbar.addAction(self.list_action)
 
+        # Department switcher, shown once the controller provides departments
+        toolbar.addSeparator()
+        department_label = QLabel("Department:")
+        department_label.setStyleSheet("color: white; font-weight: bold;")
+        self.department_combo = QComboBox()
+        self.department_combo.setMinimumWidth(150)
+        self.new_department_action = QAction(QIcon.fromTheme("folder-new"), "New Department", self)
+        self.department_widgets = [
+            toolbar.addWidget(department_label),
+            toolbar.addWidget(self.department_combo),
+            self.new_department_action,
+        ]
+        toolbar.addAction(self.new_department_action)
+        for widget_action in self.department_widgets:
+            widget_action.setVisible(False)
+
     def show_about(self):
         QMessageBox.information(
             self,
@@ -138,6 +190,70 @@ class EmployeeView(QMainWindow):
             "Employee Management System\nVersion 1.0\nDeveloped by Nguyen Le Hoang Khang"
         )
 
+    def set_departments(self, names, current: str):
+        self.department_combo.blockSignals(True)
+        self.department_combo.clear()
+        self.department_combo.addItems(names)
+        self.department_combo.setCurrentText(current)
+        self.department_combo.blockSignals(False)
+        for widget_action in self.department_widgets:
+            widget_action.setVisible(True)
+
+    def ask_metrics_path(self) -> str:
+        path, _ = QFileDialog.getSaveFileName(self, "Export Metrics", "metrics.json", "JSON Files (*.json)")
+        return path
+
+    def show_info(self, title: str, message: str):
+        QMessageBox.information(self, title, message)
+
+    def show_error(self, message: str):
+        QMessageBox.critical(self, "Error", message)
+
+    def ask_department_name(self) -> str:
+        name, accepted = QInputDialog.getText(self, "New Department", "Department name:")
+        return name.strip() if accepted else ""
+
+    def show_statistics(self, summary: dict):
+        lines = [
+            f"Employees: {summary['count']}",
+            f"Total monthly payroll: {summary['total_monthly']:.2f}",
+            f"Total annual payroll: {summary['total_annual']:.2f}",
+            f"Mean salary rate: {summary['mean']:.2f}",
+            f"Median salary rate: {summary['median']:.2f}",
+            f"10th / 90th percentile: {summary['p10']:.2f} / {summary['p90']:.2f}",
+            "",
+            "Salary bands:",
+        ]
+        lines += [f"  {low:.2f} - {high:.2f}: {count}" for low, high, count in summary['salary_bands']]
+        lines += ["", "Birth months:"]
+        lines += [
+            f"  {month if month else 'Unknown'}: {count}" for month, count in summary['birth_months'].items()
+        ]
+        QMessageBox.information(self, "Payroll Statistics", "\n".join(lines))
+
+    def show_duplicates(self, report: dict, limit: int = 50):
+        """
+        Lists the best-scoring pairs of a duplicates report; the full list
+        is under the dialog's details.
+        """
+        pairs = report['pairs']
+        lines = [f"{len(pairs)} possible duplicates among {report['records']} employees "
+                 f"({report['candidates']} pairs compared)."]
+        details = [
+            f"{pair['score']:.2f}  {pair['first']['emp_id']} {pair['first']['name']} / "
+            f"{pair['second']['emp_id']} {pair['second']['name']}: {', '.join(pair['reasons'])}"
+            for pair in pairs
+        ]
+        if details:
+            lines += [""] + details[:limit]
+            if len(details) > limit:
+                lines.append(f"... and {len(details) - limit} more")
+        box = QMessageBox(QMessageBox.Icon.Information, "Possible Duplicates", "\n".join(lines),
+                          QMessageBox.StandardButton.Ok, self)
+        if len(details) > limit:
+            box.setDetailedText("\n".join(details))
+        box.exec()
+
     def create_manage_section(self):
         layout = QVBoxLayout()
         self.manage_tab.setLayout(layout)
@@ -242,20 +358,44 @@ class EmployeeView(QMainWindow):
         search_layout.addWidget(self.search_input)
         layout.addLayout(search_layout)
 
-        # Table Widget
-        self.table = QTableWidget()
-        self.table.setColumnCount(5)
-        self.table.setHorizontalHeaderLabels(["ID", "Name", "Birthday", "Salary Rate", "Annual Salary"])
+        # Range filters, combined with the search text
+        filter_layout = QHBoxLayout()
+        self.min_salary_input = QLineEdit()
+        self.min_salary_input.setPlaceholderText("Min")
+        self.max_salary_input = QLineEdit()
+        self.max_salary_input.setPlaceholderText("Max")
+        self.birthday_filter = QComboBox()
+        for label, days in (("Any", None), ("Next 7 days", 7), ("Next 30 days", 30), ("Next 90 days", 90)):
+            self.birthday_filter.addItem(label, days)
+        clear_filters_button = QPushButton("Clear")
+        clear_filters_button.clicked.connect(self.clear_filters)
+        filter_layout.addWidget(QLabel("Salary rate:"))
+        filter_layout.addWidget(self.min_salary_input)
+        filter_layout.addWidget(QLabel("to"))
+        filter_layout.addWidget(self.max_salary_input)
+        filter_layout.addWidget(QLabel("Birthday:"))
+        filter_layout.addWidget(self.birthday_filter)
+        filter_layout.addWidget(clear_filters_button)
+        layout.addLayout(filter_layout)
+
+        # Table View backed by a model, with a proxy for sorting and filtering
+        self.table_model = EmployeeTableModel(parent=self)
+        self.proxy_model = EmployeeFilterProxyModel(self)
+        self.proxy_model.setSourceModel(self.table_model)
+        self.table = QTableView()
+        self.table.setModel(self.proxy_model)
+        self.table.verticalHeader().setDefaultSectionSize(24)
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
         self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
         self.table.setAlternatingRowColors(True)
         self.table.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 background-color: #FFFFFF;
                 gridline-color: #2E8B57; /* SeaGreen */
             }
-            QTableWidget::item:selected {
+            QTableView::item:selected {
                 background-color: #20B2AA; /* LightSeaGreen */
                 color: white;
             }
@@ -267,11 +407,33 @@ class EmployeeView(QMainWindow):
             }
         """)
         self.table.setSortingEnabled(True)  # Enable sorting
+        self.table.sortByColumn(0, Qt.SortOrder.AscendingOrder)
 
         layout.addWidget(self.table)
+        self.search_input.textChanged.connect(self.search_timer.start)
+        self.min_salary_input.textChanged.connect(self.search_timer.start)
+        self.max_salary_input.textChanged.connect(self.search_timer.start)
+        self.birthday_filter.currentIndexChanged.connect(self.search_timer.start)
 
-        # Connect search input to filtering function
-        self.search_input.textChanged.connect(self.filter_employees)
+    def clear_filters(self):
+        self.min_salary_input.clear()
+        self.max_salary_input.clear()
+        self.birthday_filter.setCurrentIndex(0)
+
+    def on_tab_changed(self, index: int):
+        if self.tabs.widget(index) is self.list_tab:
+            self.ensure_employee_list()
+
+    def ensure_employee_list(self):
+        """
+        Builds the Employee List tab if it has not been built yet and asks
+        for its rows through employee_list_created.
+        """
+        if self.employee_list_built:
+            return
+        self.create_employee_list()
+        self.employee_list_built = True
+        self.employee_list_created.emit()
 
     def get_employee_details(self) -> dict:
         return {
@@ -281,49 +443,133 @@ class EmployeeView(QMainWindow):
             'salary_rate': self.salary_input.text().strip(),
         }
 
+    @timed("view.display_employees")
     def display_employees(self, employees):
-        self.table.setRowCount(0)
-        for emp in employees:
-            row_position = self.table.rowCount()
-            self.table.insertRow(row_position)
-            self.table.setItem(row_position, 0, QTableWidgetItem(emp.emp_id))
-            self.table.setItem(row_position, 1, QTableWidgetItem(emp.name))
-            self.table.setItem(row_position, 2, QTableWidgetItem(emp.birthday))
-            self.table.setItem(row_position, 3, QTableWidgetItem(f"{emp.salary_rate:.2f}"))
-            self.table.setItem(row_position, 4, QTableWidgetItem(f"{emp.get_annual_salary():.2f}"))
-
-    def get_selected_employee_index(self) -> int:
-        selected_items = self.table.selectedItems()
-        if selected_items:
-            return self.table.currentRow()
-        return -1
-
-    def filter_employees(self):
-        filter_text = self.search_input.text().lower()
-        for row in range(self.table.rowCount()):
-            item_id = self.table.item(row, 0).text().lower()
-            item_name = self.table.item(row, 1).text().lower()
-            if filter_text in item_id or filter_text in item_name:
-                self.table.setRowHidden(row, False)
-            else:
-                self.table.setRowHidden(row, True)
+        # Until the list tab is opened there is nothing to fill; it asks
+        # for the current rows when it is built
+        if not self.employee_list_built:
+            return
+        self.table_model.set_employees(employees)
+
+    @timed("view.display_pages")
+    def display_pages(self, fetch_page):
+        """
+        Shows the rows of fetch_page(after, limit), fetching further pages
+        only as the table is scrolled down to them.
+        """
+        if not self.employee_list_built:
+            return
+        self.table_model.set_pages(fetch_page)
+
+    @timed("view.apply_change")
+    def apply_change(self, event: ChangeEvent):
+        """
+        Applies a single-row change to the table without rebuilding it, so
+        scroll position, selection and the search filter are kept.
+        """
+        if not self.employee_list_built:
+            return
+        if event.kind == ChangeEvent.INSERTED:
+            self.table_model.insert_employee(event.new)
+        elif event.kind == ChangeEvent.UPDATED:
+            self.table_model.replace_employee(event.old, event.new)
+        elif event.kind == ChangeEvent.REMOVED:
+            self.table_model.remove_employee(event.old)
+
+    def get_selected_employee(self):
+        """
+        Returns the Employee behind the selected row, mapped through the
+        sort/filter proxy, or None if nothing is selected.
+        """
+        if not self.employee_list_built:
+            return None
+        selected_rows = self.table.selectionModel().selectedRows()
+        if not selected_rows:
+            return None
+        return self.proxy_model.data(selected_rows[0], EmployeeRole)
+
+    def get_search_text(self) -> str:
+        return self.search_input.text() if self.employee_list_built else ""
+
+    def get_range_filters(self) -> dict:
+        """
+        Returns the salary bounds and birthday window in days, each None
+        when left empty or not a number.
+        """
+        if not self.employee_list_built:
+            return {'min_salary': None, 'max_salary': None, 'birthday_within_days': None}
+        filters = {'birthday_within_days': self.birthday_filter.currentData()}
+        for key, widget in (('min_salary', self.min_salary_input), ('max_salary', self.max_salary_input)):
+            text = widget.text().strip()
+            try:
+                filters[key] = float(text) if text else None
+            except ValueError:
+                filters[key] = None
+        return filters
+
+    @timed("view.show_search_results")
+    def show_search_results(self, matching_ids):
+        if not self.employee_list_built:
+            return
+        self.proxy_model.set_matching_ids(matching_ids)
+        # A paged source filters by the same IDs, so its pages start over
+        self.table_model.refetch()
 
     # Setter methods to bind controller commands
     def set_add_employee_command(self, command):
-        self.add_button.clicked.connect(command)
-        self.add_action.triggered.connect(command)
+        self.add_button.clicked.connect(_ignore_checked(command))
+        self.add_action.triggered.connect(_ignore_checked(command))
 
     def set_update_employee_command(self, command):
-        self.update_button.clicked.connect(command)
-        self.update_action.triggered.connect(command)
+        self.update_button.clicked.connect(_ignore_checked(command))
+        self.update_action.triggered.connect(_ignore_checked(command))
 
     def set_delete_employee_command(self, command):
-        self.delete_button.clicked.connect(command)
-        self.delete_action.triggered.connect(command)
+        self.delete_button.clicked.connect(_ignore_checked(command))
+        self.delete_action.triggered.connect(_ignore_checked(command))
 
     def set_list_employees_command(self, command):
-        self.list_button.clicked.connect(command)
-        self.list_action.triggered.connect(command)
+        self.list_button.clicked.connect(_ignore_checked(command))
+        self.list_action.triggered.connect(_ignore_checked(command))
+
+    def set_switch_department_command(self, command):
+        self.department_combo.textActivated.connect(command)
+
+    def set_new_department_command(self, command):
+        self.new_department_action.triggered.connect(_ignore_checked(command))
+
+    def set_show_statistics_command(self, command):
+        self.statistics_action.triggered.connect(_ignore_checked(command))
+
+    def set_find_duplicates_command(self, command):
+        self.duplicates_action.triggered.connect(_ignore_checked(command))
+
+    def set_collect_metrics_command(self, command):
+        self.collect_metrics_action.toggled.connect(command)
+
+    def set_profile_next_command(self, command):
+        self.profile_action.triggered.connect(_ignore_checked(command))
+
+    def set_export_metrics_command(self, command):
+        self.export_metrics_action.triggered.connect(_ignore_checked(command))
+
+    def set_show_employee_list_command(self, command):
+        self.employee_list_created.connect(command)
+
+    def show_loading(self, loading: bool):
+        if loading:
+            self.statusBar().showMessage("Loading employees...")
+        else:
+            self.statusBar().clearMessage()
+
+    def show_status(self, message: str):
+        if message:
+            self.statusBar().showMessage(message)
+        else:
+            self.statusBar().clearMessage()
+
+    def set_search_employees_command(self, command):
+        self.search_timer.timeout.connect(command)
 
     # Additional methods for input validation feedback
     def highlight_input(self, widget: QLineEdit, valid: bool):
@@ -337,3 +583,16 @@ class EmployeeView(QMainWindow):
         for widget in widgets:
             widget.setStyleSheet("")
 
+    def highlight_fields(self, fields):
+        """
+        Marks the inputs for the given field names (e.g. the keys of a
+        validation error dict) as invalid.
+        """
+        widgets = {
+            'emp_id': self.emp_id_input,
+            'name': self.name_input,
+            'birthday': self.birthday_input,
+            'salary_rate': self.salary_input,
+        }
+        for field_name in fields:
+            self.highlight_input(widgets[field_name], False)